@@ -0,0 +1,41 @@
+import statistics
+import subprocess
+import sys
+import time
+
+# Cold-start benchmark for the nesting CLI. Times a full process launch several times and
+# checks which heavy libraries get imported just by loading multi_plate7.
+#
+#   python bench_startup.py                               # python multi_plate7.py --help
+#   python bench_startup.py dist/multi_plate7.exe --help  # the frozen exe
+#   python bench_startup.py python multi_plate7.py --random 3 --dxf "" --output-db ""
+
+HEAVY_MODULES = ['rectpack', 'ezdxf', 'matplotlib', 'layout_render']
+
+
+def time_command(command, runs=10):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def heavy_modules_on_import(module='multi_plate7'):
+    code = (f"import sys, {module}; "
+            f"print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))")
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+    return out.split()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1:] or [sys.executable, 'multi_plate7.py', '--help']
+    times = time_command(command)
+    print(f"{' '.join(command)}")
+    print(f"  runs {len(times)}, min {min(times) * 1000:.0f} ms, median {statistics.median(times) * 1000:.0f} ms, "
+          f"max {max(times) * 1000:.0f} ms")
+    baseline = time_command([sys.executable, '-c', 'pass'])
+    print(f"  bare interpreter: median {statistics.median(baseline) * 1000:.0f} ms")
+    loaded = heavy_modules_on_import()
+    print(f"  heavy modules loaded by 'import multi_plate7': {', '.join(loaded) or 'none'}")
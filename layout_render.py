@@ -0,0 +1,107 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+
+# Batched layout rendering. A bin is a list of (x, y, width, height, label) placements.
+# Every bin is drawn with one PolyCollection instead of one patch per part, on an Agg
+# canvas without pyplot, so rendering is linear in the part count and safe to run in
+# worker threads or processes.
+
+
+def _vertices(placements, dx=0, dy=0):
+    arr = np.array([p[:4] for p in placements], dtype=float).reshape(-1, 4)
+    x0 = arr[:, 0] + dx
+    y0 = arr[:, 1] + dy
+    x1 = x0 + arr[:, 2]
+    y1 = y0 + arr[:, 3]
+    return np.stack([np.column_stack([x0, y0]), np.column_stack([x1, y0]),
+                     np.column_stack([x1, y1]), np.column_stack([x0, y1])], axis=1)
+
+
+def _labels(ax, placements, dx=0, dy=0, fontsize=6):
+    for x, y, w, h, label in placements:
+        ax.text(x + dx + w / 2, y + dy + h / 2, str(label), ha="center", va="center", fontsize=fontsize,
+                rotation=90 if w < h else 0)
+
+
+def draw_bin(ax, placements, bin_size, title=None, labels=False, facecolor='skyblue'):
+    ax.add_collection(PolyCollection(_vertices(placements), facecolors=facecolor, edgecolors='black',
+                                     linewidths=0.5, alpha=0.6))
+    if labels:
+        _labels(ax, placements)
+    if title:
+        ax.set_title(title)
+    ax.set_xlim(0, bin_size[0])
+    ax.set_ylim(0, bin_size[1])
+    ax.set_aspect('equal')
+
+
+def render_bin_image(placements, bin_size, filename, title=None, labels=False, facecolor='skyblue', dpi=100):
+    fig = Figure(figsize=(5, 5))
+    FigureCanvasAgg(fig)
+    draw_bin(fig.add_subplot(), placements, bin_size, title, labels, facecolor)
+    fig.tight_layout()
+    fig.savefig(filename, dpi=dpi)
+
+
+def render_contact_sheet(bins, bin_size, filename, titles=None, columns=None, labels=False,
+                         facecolor='skyblue', tile_inches=2.5, dpi=100):
+    # All bins tiled into one axes: one collection for every part and one for the outlines
+    n = max(len(bins), 1)
+    columns = columns or math.ceil(math.sqrt(n))
+    rows = math.ceil(n / columns)
+    gap_x = bin_size[0] * 0.1
+    gap_y = bin_size[1] * 0.15  # leaves room for the title above each bin
+    pitch_x = bin_size[0] + gap_x
+    pitch_y = bin_size[1] + gap_y
+
+    fig = Figure(figsize=(columns * tile_inches, rows * tile_inches * pitch_y / pitch_x))
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+
+    part_vertices = []
+    outlines = []
+    for i, placements in enumerate(bins):
+        dx = (i % columns) * pitch_x
+        dy = (rows - 1 - i // columns) * pitch_y
+        part_vertices.append(_vertices(placements, dx, dy))
+        outlines.append(_vertices([(0, 0, bin_size[0], bin_size[1])], dx, dy)[0])
+        if labels:
+            _labels(ax, placements, dx, dy, fontsize=4)
+        title = titles[i] if titles else f"Bin {i}"
+        ax.text(dx, dy + bin_size[1] + gap_y * 0.2, title, ha="left", va="bottom", fontsize=7)
+
+    if part_vertices:
+        ax.add_collection(PolyCollection(np.concatenate(part_vertices), facecolors=facecolor,
+                                         edgecolors='black', linewidths=0.3, alpha=0.6))
+    ax.add_collection(PolyCollection(outlines, facecolors='none', edgecolors='red', linewidths=0.5))
+    ax.set_xlim(-gap_x / 2, columns * pitch_x - gap_x / 2)
+    ax.set_ylim(-gap_y / 2, rows * pitch_y)
+    ax.set_aspect('equal')
+    ax.axis('off')
+    fig.savefig(filename, dpi=dpi)
+
+
+def _render_chunk(args):
+    jobs, bin_size, labels, facecolor = args
+    for placements, filename, title in jobs:
+        render_bin_image(placements, bin_size, filename, title, labels, facecolor)
+    return len(jobs)
+
+
+def render_bins(bins, bin_size, pattern, titles=None, labels=False, facecolor='skyblue', workers=None):
+    # One image per bin (pattern is formatted with the bin index), rendered in worker processes
+    jobs = [(placements, pattern.format(i), titles[i] if titles else f"Bin {i}") for i, placements in enumerate(bins)]
+    if not jobs:
+        return []
+    workers = workers or os.cpu_count() or 1
+    chunk = math.ceil(len(jobs) / workers)
+    chunks = [(jobs[k:k + chunk], bin_size, labels, facecolor) for k in range(0, len(jobs), chunk)]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        list(pool.map(_render_chunk, chunks))
+    return [job[1] for job in jobs]
@@ -1,9 +1,12 @@
+import itertools
 import random
 
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
 import math
+from occupancy import CornerPointGrid, FailedSizeCache, SpatialHash
+from layout_render import render_contact_sheet
 
 #完成多尺寸排布，每个board的利用率最高，但是当数值变大，到1000的数量级时，报错
 
@@ -19,17 +22,13 @@ def sort_rectangles(rectangles):
     return sorted(rectangles, key=lambda x: x.width * x.height, reverse=True)
 
 def find_placement_for_0(rect, placements, bin_width, bin_height, occupied):
-    for x in range(bin_width - rect.width + 1):
-        for y in range(bin_height - rect.height + 1):
-            if all(not occupied[xi][yi] for xi in range(x, x + rect.width) for yi in range(y, y + rect.height)):
-                return x, y
-    return None
+    return occupied.find_position(rect.width, rect.height)
 
 def optimize_layout_0(rectangles, bin_width, bin_height):
     boards = []
     while any(rect.max_count > 0 for rect in rectangles):
         sorted_rects = sort_rectangles([r for r in rectangles if r.max_count > 0])
-        occupied = [[False] * bin_height for _ in range(bin_width)]
+        occupied = CornerPointGrid(bin_width, bin_height)
         board = []
 
         for rect in sorted_rects:
@@ -39,9 +38,7 @@ def optimize_layout_0(rectangles, bin_width, bin_height):
                     x, y = placement
                     board.append((rect.id, x, y, rect.width, rect.height))
                     rect.max_count -= 1
-                    for xi in range(x, x + rect.width):
-                        for yi in range(y, y + rect.height):
-                            occupied[xi][yi] = True
+                    occupied.mark_occupied(x, y, rect.width, rect.height)
                 else:
                     break
         boards.append(board)
@@ -51,29 +48,32 @@ def find_placement_for(rect, bin_width, bin_height, occupied, allow_rotation=Tru
     # Try placing the rectangle without rotation
     for orientation in [(rect.width, rect.height), (rect.height, rect.width)] if allow_rotation else [(rect.width, rect.height)]:
         width, height = orientation
-        for x in range(bin_width - width + 1):
-            for y in range(bin_height - height + 1):
-                if all(not occupied[xi][yi] for xi in range(x, x + width) for yi in range(y, y + height)):
-                    return x, y, width, height
+        position = occupied.find_position(width, height)
+        if position is not None:
+            return position[0], position[1], width, height
     return None, None, None, None
 
 def optimize_layout0(rectangles, bin_width, bin_height):
     boards = []
     while any(rect.max_count > 0 for rect in rectangles):
         sorted_rects = sort_rectangles([r for r in rectangles if r.max_count > 0])
-        occupied = [[False] * bin_height for _ in range(bin_width)]
+        occupied = CornerPointGrid(bin_width, bin_height)
+        failed = FailedSizeCache()
         board = []
 
         for rect in sorted_rects:
             while rect.max_count > 0:
+                # Skip the scan if a part no larger than this one already failed on this board
+                if failed.dominated(rect.width, rect.height) and failed.dominated(rect.height, rect.width):
+                    break
                 x, y, placed_width, placed_height = find_placement_for(rect, bin_width, bin_height, occupied)
                 if x is not None:
                     board.append((rect.id, x, y, placed_width, placed_height))
                     rect.max_count -= 1
-                    for xi in range(x, x + placed_width):
-                        for yi in range(y, y + placed_height):
-                            occupied[xi][yi] = True
+                    occupied.mark_occupied(x, y, placed_width, placed_height)
                 else:
+                    failed.add(rect.width, rect.height)
+                    failed.add(rect.height, rect.width)
                     break
         boards.append(board)
     return boards
@@ -96,71 +96,25 @@ def plot_all_boards_layout0(boards, bin_width, bin_height, filename="all_boards_
     plt.show()
 
 
-def optimize_layout(rectangles, bin_width, bin_height, initial_temp=100, cooling_rate=0.95, iterations=1000):
-    current_layout = [
-        [rect.id, random.randint(0, bin_width - rect.width), random.randint(0, bin_height - rect.height), rect.width,
-         rect.height] for rect in rectangles]
-    current_fitness = len(current_layout)
-    best_layout = current_layout
-    best_fitness = current_fitness
-
-    temp = initial_temp
-    for i in range(iterations):
-        rectangle_index = random.randint(0, len(current_layout) - 1)
-        new_layout = current_layout.copy()
-        new_layout[rectangle_index] = [current_layout[rectangle_index][0],
-                                       random.randint(0, bin_width - current_layout[rectangle_index][3]),
-                                       random.randint(0, bin_height - current_layout[rectangle_index][4]),
-                                       current_layout[rectangle_index][3], current_layout[rectangle_index][4]]
-
-        occupied = [[any((p[1] <= x < p[1] + p[3]) and (p[2] <= y < p[2] + p[4]) for p in new_layout) for y in
-                     range(bin_height)] for x in range(bin_width)]
-        if not any(occupied[new_layout[rectangle_index][1]][new_layout[rectangle_index][2]]):
-            new_fitness = len(new_layout)
-            if new_fitness < current_fitness or math.exp((current_fitness - new_fitness) / temp) > random.random():
-                current_layout = new_layout
-                current_fitness = new_fitness
-
-            if current_fitness < best_fitness:
-                best_layout = current_layout
-                best_fitness = current_fitness
-
-        temp *= cooling_rate
+def _board_summary(placements, bin_width, bin_height):
+    types = {}
+    for rect_id, x, y, width, height in placements:
+        types[rect_id] = types.get(rect_id, 0) + 1
+    used_area = sum(width * height for _, _, _, width, height in placements)
+    return {'placements': placements, 'types': types,
+            'vacancy_rate': (bin_width * bin_height - used_area) / (bin_width * bin_height) * 100}
 
-    boards = []
-    for placement in best_layout:
-        rect_id, x, y, width, height = placement
-        rect = next((r for r in rectangles if r.id == rect_id), None)
-        if rect:
-            rect.max_count -= 1
-            if rect.max_count == 0:
-                rectangles.remove(rect)
-            boards.append({'placements': [(rect_id, x, y, width, height)], 'types': {rect_id: 1},
-                           'vacancy_rate': (bin_width * bin_height - width * height) / (bin_width * bin_height) * 100})
-
-    return boards
+def optimize_layout(rectangles, bin_width, bin_height, initial_temp=0.1, cooling_rate=0.9995, iterations=20000):
+    # Greedy first-fit boards, then annealed to empty the weakest boards
+    boards = simulated_annealing(optimize_layout0(rectangles, bin_width, bin_height), bin_width, bin_height,
+                                 initial_temp, cooling_rate, iterations)
+    return [_board_summary(board, bin_width, bin_height) for board in boards]
 
 def plot_all_boards_layout(boards, bin_width, bin_height, filename="all_boards_layout.jpg"):
-    fig, axs = plt.subplots(1, len(boards), figsize=(len(boards) * 5, 5), constrained_layout=True)
-    if len(boards) == 1:
-        axs = [axs]
-    for i, board in enumerate(boards):
-        ax = axs[i]
-        ax.set_xlim(0, bin_width)
-        ax.set_ylim(0, bin_height)
-        ax.set_title(f'Board {i+1}')
-        for id, x, y, width, height in board['placements']:
-            ax.add_patch(patches.Rectangle((x, y), width, height, edgecolor='black', facecolor='skyblue', alpha=0.6))
-            ax.text(x + width / 2, y + height / 2, str(id), ha="center", va="center", color='black')
-        ax.set_aspect('equal')
-        # Annotation for vacancy rate and count of rectangles
-        ax.annotate(f"Vacancy Rate: {board['vacancy_rate']:.2f}%\n" +
-                    "\n".join([f"Type {k}: {v}" for k, v in board['types'].items()]),
-                    xy=(1, 0.2), xycoords='axes fraction', xytext=(5, -5), textcoords='offset points',
-                    ha='right', va='top', fontsize=9)
-
-    plt.savefig(filename)
-    plt.show()
+    bins = [[(x, y, width, height, id) for id, x, y, width, height in board['placements']] for board in boards]
+    titles = [f"Board {i+1}  Vacancy {board['vacancy_rate']:.2f}%  " +
+              ", ".join(f"T{k}x{v}" for k, v in board['types'].items()) for i, board in enumerate(boards)]
+    render_contact_sheet(bins, (bin_width, bin_height), filename, titles=titles, labels=True)
 
     # Print information for each board
     for i, board in enumerate(boards):
@@ -207,57 +161,117 @@ def generate_random_rectangles(num_types, total_count, width_range=(200, 500), h
     return rectangles
 
 
-def generate_neighbor_solution(solution, rectangles, bin_width, bin_height):
-    new_solution = solution.copy()
-    board_index = random.randint(0, len(new_solution) - 1)
-    board = new_solution[board_index]
-
-    operation = random.choice(['swap', 'move'])
-    if operation == 'swap':
-        if len(board['placements']) >= 2:
-            rect1_index, rect2_index = random.sample(range(len(board['placements'])), 2)
-            board['placements'][rect1_index], board['placements'][rect2_index] = board['placements'][rect2_index], \
-            board['placements'][rect1_index]
-    elif operation == 'move':
-        if len(board['placements']) >= 1:
-            rect_index = random.randint(0, len(board['placements']) - 1)
-            rect_id, _, _, _, _ = board['placements'].pop(rect_index)
-            rect = next((r for r in rectangles if r.id == rect_id), None)
-            if rect:
-                occupied = [
-                    [any((p[1] <= x < p[1] + p[3]) and (p[2] <= y < p[2] + p[4]) for p in board['placements']) for y in
-                     range(bin_height)] for x in range(bin_width)]
-                placement = find_placement_for(rect, bin_width, bin_height, occupied)
-                if placement:
-                    x, y, placed_width, placed_height = placement
-                    board['placements'].append((rect.id, x, y, placed_width, placed_height))
-
-    return new_solution
-
+# Annealing over whole boards. A solution is a tuple of BoardState objects that are never
+# modified. A move takes one part off a board and re-inserts it on another (or the same)
+# board, checking overlap through the target board's SpatialHash. Its cost change comes
+# from the two boards' used areas alone, and new BoardState objects are only built for
+# those two boards once the move is accepted; every other board is shared.
+class BoardState:
+    def __init__(self, index, keys, used_area):
+        self.index = index          # SpatialHash of the parts on the board, keyed (rect_id, serial)
+        self.keys = keys            # the same keys as a tuple, for O(1) random picks
+        self.used_area = used_area
+
+    def placements(self):
+        return [(key[0], x, y, width, height) for key, (x, y, width, height) in self.index.rects.items()]
+
+def _board_state(placements, cell, serial):
+    index = SpatialHash(cell)
+    keys = []
+    for rect_id, x, y, width, height in placements:
+        key = (rect_id, next(serial))
+        index = index.with_added(key, x, y, width, height)
+        keys.append(key)
+    return BoardState(index, tuple(keys), sum(p[3] * p[4] for p in placements))
+
+def _solution_cost(board_count, sum_sq):
+    # Fewer boards first; at equal counts prefer uneven fill (sum of squared utilizations),
+    # which pushes parts off the emptiest board
+    return board_count - sum_sq / board_count
+
+def propose_move(boards, bin_width, bin_height, allow_rotation=True, tries=20):
+    # (src, key, dst, x, y, width, height) or None; candidate anchors are the corners
+    # right of and above a random part already on the target board
+    # Half the moves take a part from the emptiest board, the one the cost wants to drain
+    if random.random() < 0.5:
+        src = min(range(len(boards)), key=lambda k: boards[k].used_area)
+    else:
+        src = random.randrange(len(boards))
+    key = random.choice(boards[src].keys)
+    _, _, width, height = boards[src].index.rects[key]
+    dst = random.randrange(len(boards))
+    target = boards[dst]
+    ignore = key if dst == src else None
+    for _ in range(tries):
+        if allow_rotation and random.random() < 0.5:
+            width, height = height, width
+        rx, ry, rw, rh = target.index.rects[random.choice(target.keys)]
+        x, y = random.choice(((rx + rw, ry), (rx, ry + rh), (rx + rw, 0), (0, ry + rh), (rx + rw, ry + rh)))
+        if x + width <= bin_width and y + height <= bin_height and \
+                not target.index.overlaps(x, y, width, height, ignore):
+            return src, key, dst, x, y, width, height
+    return None
 
-def simulated_annealing(rectangles, bin_width, bin_height, initial_temp=100, cooling_rate=0.95, iterations=1000):
-    current_solution = optimize_layout(rectangles, bin_width, bin_height)
-    current_cost = len(current_solution)
-    best_solution = current_solution
-    best_cost = current_cost
+def move_effect(boards, move, board_area, sum_sq):
+    # Board count and sum of squared utilizations after the move, without applying it
+    src, key, dst, x, y, width, height = move
+    if src == dst:
+        return len(boards), sum_sq
+    area = width * height
+    source, target = boards[src].used_area, boards[dst].used_area
+    sum_sq += ((source - area) ** 2 + (target + area) ** 2 - source ** 2 - target ** 2) / board_area ** 2
+    return len(boards) - (1 if len(boards[src].keys) == 1 else 0), sum_sq
+
+def apply_move(boards, move):
+    src, key, dst, x, y, width, height = move
+    source, target = boards[src], boards[dst]
+    new_boards = list(boards)
+    if src == dst:
+        new_boards[src] = BoardState(source.index.with_removed(key).with_added(key, x, y, width, height),
+                                     source.keys, source.used_area)
+        return tuple(new_boards)
+    area = width * height
+    new_boards[dst] = BoardState(target.index.with_added(key, x, y, width, height), target.keys + (key,),
+                                 target.used_area + area)
+    if len(source.keys) == 1:
+        del new_boards[src]
+    else:
+        new_boards[src] = BoardState(source.index.with_removed(key), tuple(k for k in source.keys if k != key),
+                                     source.used_area - area)
+    return tuple(new_boards)
+
+def simulated_annealing(boards, bin_width, bin_height, initial_temp=0.1, cooling_rate=0.9995, iterations=20000,
+                        allow_rotation=True):
+    # boards: lists of (rect_id, x, y, width, height); returns the best solution found in
+    # the same form
+    boards = [board for board in boards if board]
+    if not boards:
+        return []
+    sizes = [max(p[3], p[4]) for board in boards for p in board]
+    cell = max(1, sum(sizes) // len(sizes))
+    serial = itertools.count()
+    board_area = bin_width * bin_height
+
+    current = tuple(_board_state(board, cell, serial) for board in boards)
+    sum_sq = sum((b.used_area / board_area) ** 2 for b in current)
+    current_cost = _solution_cost(len(current), sum_sq)
+    best_solution, best_cost = current, current_cost
 
     temp = initial_temp
     for i in range(iterations):
-        new_solution = generate_neighbor_solution(current_solution, rectangles, bin_width, bin_height)
-        new_cost = len(new_solution)
-        cost_diff = new_cost - current_cost
-
-        if cost_diff < 0 or math.exp(-cost_diff / temp) > random.random():
-            current_solution = new_solution
-            current_cost = new_cost
-
-        if current_cost < best_cost:
-            best_solution = current_solution
-            best_cost = current_cost
-
+        move = propose_move(current, bin_width, bin_height, allow_rotation)
+        if move is not None:
+            new_count, new_sum_sq = move_effect(current, move, board_area, sum_sq)
+            new_cost = _solution_cost(new_count, new_sum_sq)
+            cost_diff = new_cost - current_cost
+            if cost_diff <= 0 or math.exp(-cost_diff / temp) > random.random():
+                current = apply_move(current, move)
+                current_cost, sum_sq = new_cost, new_sum_sq
+                if current_cost < best_cost:
+                    best_solution, best_cost = current, current_cost
         temp *= cooling_rate
 
-    return best_solution
+    return [board.placements() for board in best_solution]
 
 
 # Define rectangles and board dimensions
@@ -283,7 +297,6 @@ bin_height = 120
 
 # Optimize the layout and get the boards
 #boards = optimize_layout(rectangles, bin_width, bin_height)
-#boards = simulated_annealing(rectangles, bin_width, bin_height)
 
 
 boards = optimize_layout(rectangles, bin_width, bin_height)
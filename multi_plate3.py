@@ -2,6 +2,8 @@ import random
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import numpy as np
+from occupancy import BitmapGrid, grid_scale
+from layout_render import render_contact_sheet
 
 class Rectangle:
     def __init__(self, id, width, height, total_count):
@@ -65,76 +67,13 @@ def optimize_layout(rectangles, bin_width, bin_height, occupied_grid):
     return boards
 
 
-class QuadTree:
-    def __init__(self, x, y, width, height):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.children = [None, None, None, None]  # NW, NE, SW, SE
-        self.occupied = False
-
-    def split(self):
-        half_width = self.width // 2
-        half_height = self.height // 2
-        self.children[0] = QuadTree(self.x, self.y, half_width, half_height)  # NW
-        self.children[1] = QuadTree(self.x + half_width, self.y, half_width, half_height)  # NE
-        self.children[2] = QuadTree(self.x, self.y + half_height, half_width, half_height)  # SW
-        self.children[3] = QuadTree(self.x + half_width, self.y + half_height, half_width, half_height)  # SE
-
-    def insert(self, x, y, x2, y2):
-        if x >= self.x and x2 <= self.x + self.width and y >= self.y and y2 <= self.y + self.height:
-            if self.occupied:
-                return
-            if self.width == 1 and self.height == 1:
-                self.occupied = True
-            else:
-                if not any(self.children):
-                    self.split()
-                for child in self.children:
-                    child.insert(x, y, x2, y2)
-
-    def query(self, width, height):
-        if self.occupied:
-            return [(self.x, self.y)]
-        if width > self.width or height > self.height:
-            return []
-        if width <= self.width and height <= self.height and all(self.children):
-            return [(self.x, self.y)]
-        positions = []
-        for child in self.children:
-            if child:
-                positions.extend(child.query(width, height))
-        return positions
-
-
-
-class OccupancyGrid:
-    def __init__(self, width, height):
-        self.width = width
-        self.height = height
-        self.grid = [[False] * height for _ in range(width)]
-
-    def is_occupied(self, x, y, width, height):
-        for i in range(x, x + width):
-            for j in range(y, y + height):
-                if self.grid[i][j]:
-                    return True
-        return False
-
-    def mark_occupied(self, x, y, width, height):
-        for i in range(x, x + width):
-            for j in range(y, y + height):
-                self.grid[i][j] = True
-
 # Update find_placement_for function
 def find_placement_for(rect, bin_width, bin_height, occupied_grid, allow_rotation=True):
     for orientation in [(rect.width, rect.height), (rect.height, rect.width)] if allow_rotation else [(rect.width, rect.height)]:
         width, height = orientation
-        for x in range(bin_width - width + 1):
-            for y in range(bin_height - height + 1):
-                if not occupied_grid.is_occupied(x, y, width, height):
-                    return x, y, width, height
+        position = occupied_grid.find_position(width, height)
+        if position is not None:
+            return position[0], position[1], width, height
     return None, None, None, None
 
 
@@ -158,22 +97,12 @@ def plot_layout(rectangles, bin_width, bin_height, title='Final Layout'):
     plt.gca().set_aspect('equal', adjustable='box')
     plt.show()
 
-def plot_total_layout(boards, bin_width, bin_height):
-    fig, ax = plt.subplots(figsize=(8, 8))
-    ax.add_patch(patches.Rectangle((0, 0), bin_width, bin_height, edgecolor='r', facecolor='none'))
-
-    for board in boards:
-        for rect_id, x, y, width, height in board['placements']:
-            ax.add_patch(
-                patches.Rectangle((x, y), width, height, edgecolor='black', facecolor='skyblue', alpha=0.6,
-                                  label=f"ID: {rect_id}"))
-            plt.text(x + width / 2, y + height / 2, str(rect_id), ha="center", va="center", color='black')
-
-    plt.xlim(0, bin_width)
-    plt.ylim(0, bin_height)
-    plt.title('Total Layout')
-    plt.gca().set_aspect('equal', adjustable='box')
-    plt.show()
+def plot_total_layout(boards, bin_width, bin_height, filename="total_layout.jpg"):
+    # All boards side by side in one image, one board per tile
+    bins = [[(x, y, width, height, rect_id) for rect_id, x, y, width, height in board['placements']]
+            for board in boards]
+    render_contact_sheet(bins, (bin_width, bin_height), filename,
+                         titles=[f'Board {i+1}' for i in range(len(boards))], labels=True)
 
 
 def generate_arrangement_matrix(boards, num_types):
@@ -192,17 +121,9 @@ rectangles = generate_random_rectangles(num_types, total_count)
 bin_width = 4000
 bin_height = 12000
 
-# Initialize the 'occupied' matrix with True values
-occupied = [[True] * bin_height for _ in range(bin_width)]
-# Initialize the Quadtree with the root node as occupied
-quadtree = QuadTree(0, 0, bin_width, bin_height)
-quadtree.occupied = True
-
-#boards = optimize_layout(rectangles, bin_width, bin_height, occupied, quadtree)
-
-
-# Initialize the occupancy grid
-occupancy_grid = OccupancyGrid(bin_width, bin_height)
+# Initialize the occupancy grid on the coarsest exact cell size (at 1 mm, about 6 MB for this sheet)
+scale = grid_scale([(r.width, r.height) for r in rectangles], bin_width, bin_height)
+occupancy_grid = BitmapGrid(bin_width, bin_height, scale)
 
 # Run the optimization
 boards = optimize_layout(rectangles, bin_width, bin_height, occupancy_grid)
@@ -1,5 +1,5 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
+from occupancy import CornerPointGrid, FailedSizeCache
+from layout_render import render_contact_sheet
 
 
 # 增加考虑0度和90度布置
@@ -16,55 +16,16 @@ def sort_rectangles(rectangles):
     return sorted(rectangles, key=lambda x: x.width * x.height, reverse=True)
 
 def find_placement_for(rect, bin_width, bin_height, occupied, allow_rotation=True):
-    best_placement = None
     best_rotation = 0  # Keep track of whether the rectangle is rotated
 
     # Check placement without rotation
-    for x in range(bin_width - rect.width + 1):
-        for y in range(bin_height - rect.height + 1):
-            if all(not occupied[xi][yi] for xi in range(x, x + rect.width) for yi in range(y, y + rect.height)):
-                best_placement = (x, y)
-                best_rotation = 0  # No rotation
-                break
-        if best_placement:
-            break
+    best_placement = occupied.find_position(rect.width, rect.height)
 
     # Check placement with rotation if allowed and no placement found yet
     if allow_rotation and not best_placement:
-        for x in range(bin_width - rect.height + 1):
-            for y in range(bin_height - rect.width + 1):
-                if all(not occupied[xi][yi] for xi in range(x, x + rect.height) for yi in range(y, y + rect.width)):
-                    best_placement = (x, y)
-                    best_rotation = 90  # Indicates rotation
-                    break
-            if best_placement:
-                break
-
-    return best_placement, best_rotation
-def find_placement_for(rect, bin_width, bin_height, occupied, allow_rotation=True):
-    best_placement = None
-    best_rotation = 0  # Keep track of whether the rectangle is rotated
-
-    # Check placement without rotation
-    for x in range(bin_width - rect.width + 1):
-        for y in range(bin_height - rect.height + 1):
-            if all(not occupied[xi][yi] for xi in range(x, x + rect.width) for yi in range(y, y + rect.height)):
-                best_placement = (x, y)
-                best_rotation = 0  # No rotation
-                break
+        best_placement = occupied.find_position(rect.height, rect.width)
         if best_placement:
-            break
-
-    # Check placement with rotation if allowed and no placement found yet
-    if allow_rotation and not best_placement:
-        for x in range(bin_width - rect.height + 1):
-            for y in range(bin_height - rect.width + 1):
-                if all(not occupied[xi][yi] for xi in range(x, x + rect.height) for yi in range(y, y + rect.width)):
-                    best_placement = (x, y)
-                    best_rotation = 90  # Indicates rotation
-                    break
-            if best_placement:
-                break
+            best_rotation = 90  # Indicates rotation
 
     return best_placement, best_rotation
 
@@ -72,11 +33,15 @@ def optimize_layout(rectangles, bin_width, bin_height):
     boards = []
     while any(rect.max_count > 0 for rect in rectangles):
         sorted_rects = sort_rectangles([r for r in rectangles if r.max_count > 0])
-        occupied = [[False] * bin_height for _ in range(bin_width)]
+        occupied = CornerPointGrid(bin_width, bin_height)
+        failed = FailedSizeCache()
         board = []
 
         for rect in sorted_rects:
             while rect.max_count > 0:
+                # Skip the scan if a part no larger than this one already failed on this board
+                if failed.dominated(rect.width, rect.height) and failed.dominated(rect.height, rect.width):
+                    break
                 # Inside optimize_layout function
                 placement, rotation = find_placement_for(rect, bin_width, bin_height, occupied, allow_rotation=True)
 
@@ -87,40 +52,22 @@ def optimize_layout(rectangles, bin_width, bin_height):
                         rect.width, rect.height = rect.height, rect.width
                     board.append((rect.id, x, y, rect.width, rect.height, rotation))
                     rect.max_count -= 1
-                    for xi in range(x, x + rect.width):
-                        for yi in range(y, y + rect.height):
-                            occupied[xi][yi] = True
+                    occupied.mark_occupied(x, y, rect.width, rect.height)
                     if rotation == 90:
                         # Swap back after placement for future calculations
                         rect.width, rect.height = rect.height, rect.width
                 else:
+                    failed.add(rect.width, rect.height)
+                    failed.add(rect.height, rect.width)
                     break
         boards.append(board)
     return boards
 
 def plot_all_boards_layout(boards, bin_width, bin_height, filename="all_boards_layout.jpg"):
-    fig, axs = plt.subplots(1, len(boards), figsize=(len(boards) * 5, 5))
-    if len(boards) == 1:
-        axs = [axs]  # Make sure axs is iterable even if there's only one board
-    for i, board in enumerate(boards):
-        ax = axs[i]
-        ax.set_xlim(0, bin_width)
-        ax.set_ylim(0, bin_height)
-        ax.set_title(f'Board {i+1}')
-        for placement in board:
-            if len(placement) == 6:  # Check if rotation is included
-                id, x, y, width, height, rotation = placement
-                if rotation == 90:
-                    # Swap width and height for drawing because of rotation
-                    width, height = height, width
-            else:
-                id, x, y, width, height = placement  # For rectangles without rotation
-            ax.add_patch(patches.Rectangle((x, y), width, height, edgecolor='black', facecolor='skyblue', alpha=0.6))
-            ax.text(x + width / 2, y + height / 2, str(id), ha="center", va="center", color='black')
-        ax.set_aspect('equal')
-    plt.tight_layout()
-    plt.savefig(filename)
-    plt.show()
+    # Placements already hold the width and height as placed, rotated or not
+    bins = [[(p[1], p[2], p[3], p[4], p[0]) for p in board] for board in boards]
+    render_contact_sheet(bins, (bin_width, bin_height), filename,
+                         titles=[f'Board {i+1}' for i in range(len(boards))], labels=True)
 
 # Define rectangles and board dimensions
 rectangles = [
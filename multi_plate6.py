@@ -1,5 +1,7 @@
+import bisect
 import random
 import math
+from array import array
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
@@ -61,103 +63,194 @@ class Solution:
         plt.show()
 
 
+# Free space of a Bin as a set of distinct (width, height) sizes. `order` keeps them
+# sorted by (area, width, height), so the best-area fit for a part is the first fitting
+# entry from bisect on its area. A merge partner always has a known size (the same width
+# and the rest of the bin height, or the same height and the rest of the bin width), so
+# it is found with one lookup in the `sizes` hash set instead of a pairwise scan.
+class FreeRectangles:
+    def __init__(self, bin_width, bin_height):
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.order = []
+        self.sizes = set()
+        self._insert(bin_width, bin_height)
+
+    def __len__(self):
+        return len(self.order)
+
+    def __iter__(self):
+        return (Rectangle(width, height) for _, width, height in self.order)
+
+    def copy(self):
+        new_free = FreeRectangles.__new__(FreeRectangles)
+        new_free.bin_width = self.bin_width
+        new_free.bin_height = self.bin_height
+        new_free.order = list(self.order)
+        new_free.sizes = set(self.sizes)
+        return new_free
+
+    def contains(self, width, height):
+        return (width, height) in self.sizes
+
+    def _insert(self, width, height):
+        bisect.insort(self.order, (width * height, width, height))
+        self.sizes.add((width, height))
+
+    def remove(self, width, height):
+        del self.order[bisect.bisect_left(self.order, (width * height, width, height))]
+        self.sizes.discard((width, height))
+
+    def add(self, width, height):
+        # A size that is already free is dropped; two pieces of equal width that together
+        # span the bin height, or of equal height that span the bin width, become one, and
+        # the merged piece is checked the same way
+        pending = [(width, height)]
+        while pending:
+            width, height = pending.pop()
+            if self.contains(width, height):
+                continue
+            if self.contains(width, self.bin_height - height):
+                self.remove(width, self.bin_height - height)
+                pending.append((width, self.bin_height))
+            elif self.contains(self.bin_width - width, height):
+                self.remove(self.bin_width - width, height)
+                pending.append((self.bin_width, height))
+            else:
+                self._insert(width, height)
+
+    def best_fit(self, width, height, allow_rotation=True):
+        # (free_width, free_height, rotated) of the smallest free size that takes the part
+        order = self.order
+        if not order or order[-1][0] < width * height:
+            return None
+        for k in range(bisect.bisect_left(order, (width * height,)), len(order)):
+            _, free_width, free_height = order[k]
+            if free_width >= width and free_height >= height:
+                return free_width, free_height, False
+            if allow_rotation and free_width >= height and free_height >= width:
+                return free_width, free_height, True
+        return None
+
+
 class Bin:
     def __init__(self, width, height):
         self.width = width
         self.height = height
         self.used_area = 0
-        self.free_rectangles = [Rectangle(width, height)]
+        self.free = FreeRectangles(width, height)
         self.rectangles = []
 
-    def can_place(self, rect):
-        for free_rect in self.free_rectangles:
-            if (free_rect.width >= rect.width and free_rect.height >= rect.height) or \
-                    (free_rect.width >= rect.height and free_rect.height >= rect.width):
-                return True
-        return False
-
-    def place(self, rect):
-        best_rect = None
-        best_fit = float('inf')
-        for i, free_rect in enumerate(self.free_rectangles):
-            if free_rect.width >= rect.width and free_rect.height >= rect.height:
-                fit = free_rect.area - rect.area
-                if fit < best_fit:
-                    best_rect = free_rect
-                    best_fit = fit
-                    rotation = False
-            if free_rect.width >= rect.height and free_rect.height >= rect.width:
-                fit = free_rect.area - rect.area
-                if fit < best_fit:
-                    best_rect = free_rect
-                    best_fit = fit
-                    rotation = True
-
-        if best_rect is None:
+    @property
+    def free_rectangles(self):
+        return list(self.free)
+
+    def copy(self):
+        # Placed rectangles are never changed in place, so the copy shares them
+        new_bin = Bin.__new__(Bin)
+        new_bin.width = self.width
+        new_bin.height = self.height
+        new_bin.used_area = self.used_area
+        new_bin.free = self.free.copy()
+        new_bin.rectangles = list(self.rectangles)
+        return new_bin
+
+    def can_place(self, rect, allow_rotation=True):
+        return self.free.best_fit(rect.width, rect.height, allow_rotation) is not None
+
+    def place(self, rect, allow_rotation=True):
+        fit = self.free.best_fit(rect.width, rect.height, allow_rotation)
+        if fit is None:
             return False
+        free_width, free_height, rotation = fit
 
         self.used_area += rect.area
         if rotation:
-            rect.width, rect.height = rect.height, rect.width
+            # Place a rotated copy; the caller's rectangle is left as it is
+            rect = Rectangle(rect.height, rect.width)
         self.rectangles.append(rect)
 
-        if best_rect.width > rect.width:
-            self.free_rectangles.append(Rectangle(best_rect.width - rect.width, rect.height))
-        if best_rect.height > rect.height:
-            self.free_rectangles.append(Rectangle(best_rect.width, best_rect.height - rect.height))
-        self.free_rectangles.remove(best_rect)
-
-        self.merge_free_rectangles()
+        self.free.remove(free_width, free_height)
+        if free_width > rect.width:
+            self.free.add(free_width - rect.width, rect.height)
+        if free_height > rect.height:
+            self.free.add(free_width, free_height - rect.height)
         return True
 
-    def merge_free_rectangles(self):
-        for i in range(len(self.free_rectangles)):
-            for j in range(i + 1, len(self.free_rectangles)):
-                rect1 = self.free_rectangles[i]
-                rect2 = self.free_rectangles[j]
-                if rect1.width == rect2.width and rect1.height == rect2.height:
-                    self.free_rectangles.remove(rect2)
-                    return self.merge_free_rectangles()
-                if rect1.width == rect2.width and rect1.height + rect2.height == self.height:
-                    self.free_rectangles.remove(rect1)
-                    self.free_rectangles.remove(rect2)
-                    self.free_rectangles.append(Rectangle(rect1.width, self.height))
-                    return self.merge_free_rectangles()
-                if rect1.height == rect2.height and rect1.width + rect2.width == self.width:
-                    self.free_rectangles.remove(rect1)
-                    self.free_rectangles.remove(rect2)
-                    self.free_rectangles.append(Rectangle(self.width, rect1.height))
-                    return self.merge_free_rectangles()
+
+# The annealer works on a genome: a permutation of rectangle indexes (array 'i') and one
+# rotation bit per rectangle (bytearray). decode() places the rectangles in genome order,
+# each in the first bin with room, and keeps checkpoints[k], the bins before position k is
+# placed. Checkpoints are tuples of Bin objects that are never changed once built; placing
+# a rectangle copies only the bin it lands in. A move that first changes position k
+# therefore restarts from checkpoints[k] and shares everything before it.
+def decode(shapes, order, rotations, bin_width, bin_height, checkpoints=None, start=0):
+    checkpoints = checkpoints[:start + 1] if checkpoints else [()]
+    bins = checkpoints[start]
+    for k in range(start, len(order)):
+        rect = shapes[order[k]][rotations[order[k]]]
+        for j, bin in enumerate(bins):
+            if bin.can_place(rect, allow_rotation=False):
+                new_bin = bin.copy()
+                new_bin.place(rect, allow_rotation=False)
+                bins = bins[:j] + (new_bin,) + bins[j + 1:]
+                break
+        else:
+            new_bin = Bin(bin_width, bin_height)
+            new_bin.place(rect, allow_rotation=False)
+            bins = bins + (new_bin,)
+        checkpoints.append(bins)
+    return checkpoints
+
+
+def bins_fitness(bins, bin_width, bin_height):
+    return sum(bin.used_area for bin in bins) / (len(bins) * bin_width * bin_height) if bins else 0
 
 
 def simulated_annealing(rectangles, bin_width, bin_height, temp=100, cooling_rate=0.98, iterations=10000):
-    current_solution = Solution(rectangles, bin_width, bin_height)
-    current_solution.place_rectangles()
-    best_solution = current_solution
+    # Rectangles that fit the bin in neither orientation are left out
+    fits = [(r.width <= bin_width and r.height <= bin_height, r.height <= bin_width and r.width <= bin_height)
+            for r in rectangles]
+    candidates = [i for i, fit in enumerate(fits) if any(fit)]
+    shapes = [(Rectangle(r.width, r.height), Rectangle(r.height, r.width)) for r in rectangles]
+    flippable = [i for i in candidates if all(fits[i])]
+    if not candidates:
+        return Solution([], bin_width, bin_height)
+
+    # Start from decreasing area, each rectangle in an orientation that fits
+    order = array('i', sorted(candidates, key=lambda i: rectangles[i].area, reverse=True))
+    rotations = bytearray(0 if fit[0] else 1 for fit in fits)
+    checkpoints = decode(shapes, order, rotations, bin_width, bin_height)
+    fitness = bins_fitness(checkpoints[-1], bin_width, bin_height)
+    best_order, best_bins, best_fitness = order, checkpoints[-1], fitness
 
     for i in range(iterations):
         temp *= cooling_rate
-        new_solution = Solution(rectangles, bin_width, bin_height)
-        random.shuffle(new_solution.rectangles)
-        for rect in new_solution.rectangles:
-            if random.random() < 0.5:
-                rect.width, rect.height = rect.height, rect.width
-
-        # 新的邻域操作: 交换两个板材的位置
-        if random.random() < 0.1:
-            idx1, idx2 = random.sample(range(len(new_solution.rectangles)), 2)
-            new_solution.rectangles[idx1], new_solution.rectangles[idx2] = new_solution.rectangles[idx2], \
-            new_solution.rectangles[idx1]
-
-        new_solution.place_rectangles()
-
-        if new_solution.fitness > best_solution.fitness:
-            best_solution = new_solution
+        new_order, new_rotations = order, rotations
+        if len(order) > 1 and (not flippable or random.random() < 0.5):
+            # 交换两个板材的位置
+            a, b = random.sample(range(len(order)), 2)
+            new_order = array('i', order)
+            new_order[a], new_order[b] = order[b], order[a]
+            start = min(a, b)
+        elif flippable:
+            r = random.choice(flippable)
+            new_rotations = bytearray(rotations)
+            new_rotations[r] ^= 1
+            start = order.index(r)
         else:
-            acceptance_prob = math.exp((new_solution.fitness - current_solution.fitness) / temp)
-            if random.random() < acceptance_prob:
-                current_solution = new_solution
+            break
+
+        new_checkpoints = decode(shapes, new_order, new_rotations, bin_width, bin_height, checkpoints, start)
+        new_fitness = bins_fitness(new_checkpoints[-1], bin_width, bin_height)
+        if new_fitness >= fitness or (temp > 0 and random.random() < math.exp((new_fitness - fitness) / temp)):
+            order, rotations, checkpoints, fitness = new_order, new_rotations, new_checkpoints, new_fitness
+            if fitness > best_fitness:
+                best_order, best_bins, best_fitness = order, checkpoints[-1], fitness
 
+    best_solution = Solution([rectangles[i] for i in best_order], bin_width, bin_height)
+    best_solution.bins = list(best_bins)
+    best_solution.fitness = best_fitness
     return best_solution
 
 
@@ -1,9 +1,21 @@
-import rectpack
+import argparse
+import itertools
+import math
+import multiprocessing
+import operator
+import queue
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import random
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-import ezdxf
-import sqlite3
+import numpy as np
+from occupancy import CornerPointGrid, FailedSizeCache
+import pattern_library
+import plate_storage
+import result_cache
+
+# rectpack, ezdxf and matplotlib (through layout_render) are imported inside the functions
+# that need them, so the exe starts fast and only pays for the outputs a job asks for
 
 def generate_rectangles(num_types, min_size, max_size, min_count, max_count):
     rectangles = []
@@ -15,208 +27,840 @@ def generate_rectangles(num_types, min_size, max_size, min_count, max_count):
             rectangles.append((width, height, i, f"{len(rectangles)}-HLS"))
     return rectangles
 
-def read_rectangles_from_db(db_file):
-    conn = sqlite3.connect(db_file)
-    cursor = conn.cursor()
-    cursor.execute("SELECT Size_type, Count, Width, Height, ID_list FROM Plate_table_one")
-    rectangles = []
-    for row in cursor:
+def _dimension(value):
+    # Width and Height are REAL columns; whole numbers come back as ints so sizes print
+    # and compare like the --random parts
+    return int(value) if float(value).is_integer() else value
+
+def read_part_types_from_db(db_file):
+    # One entry per Size_type: (width, height, type_id, ids); pieces are only expanded on export
+    part_types = []
+    for row in plate_storage.read_part_rows(db_file):
         type_id, amount, width, height, id_list = row
         ids = [f"{id}" for id in id_list.split(',')]
-        for id in ids:
-            rectangles.append((width, height, type_id, id))
-    conn.close()
-    return rectangles
+        part_types.append((_dimension(width), _dimension(height), type_id, ids))
+    return part_types
 
-def pack_rectangles(rectangles, bin_size):
-    packer = rectpack.newPacker(rotation=True, pack_algo=rectpack.MaxRectsBssf)
+def expand_part_types(part_types):
+    return [(width, height, type_id, id) for width, height, type_id, ids in part_types for id in ids]
 
-    for r in rectangles:
-        packer.add_rect(width=r[0], height=r[1], rid=r[3])
+def group_rectangles(rectangles):
+    groups = {}
+    for width, height, type_id, id in rectangles:
+        groups.setdefault((width, height, type_id), []).append(id)
+    return [(width, height, type_id, ids) for (width, height, type_id), ids in groups.items()]
+
+def read_rectangles_from_db(db_file):
+    return expand_part_types(read_part_types_from_db(db_file))
 
+def estimate_min_bins(rectangles, bin_size):
+    bin_width, bin_height = bin_size
     total_rect_area = sum(r[0] * r[1] for r in rectangles)
-    bin_area = bin_size[0] * bin_size[1]
-    max_bins = max(1, int(2 * total_rect_area / bin_area))
-
-    bin_id_template = "BIN_{}"
-    bin_count = 0
-
-    while True:
-        packer.reset()
-        for _ in range(max_bins):
-            bin_id = bin_id_template.format(bin_count)
-            packer.add_bin(width=bin_size[0], height=bin_size[1], bid=bin_id)
-            bin_count += 1
-        packer.pack()
-
-        print(f"\nTrying with {max_bins} bins:")
-        all_rects = packer.rect_list()
-        rectangles_dict = {r[3]: r for r in rectangles}
-        for rect in all_rects:
-            b, x, y, w, h, rid = rect
-            if rid in rectangles_dict:
-                rect_data = rectangles_dict[rid]
-                print(f"Rectangle {rid} (type {rect_data[2]}, {rect_data[0]}, {rect_data[1]}) is packed in bin {b} at ({x}, {y}), rotated: {w != rect_data[0]}")
-            else:
-                print(f"Rectangle {rid} not found in the original list")
+    area_bound = math.ceil(total_rect_area / (bin_width * bin_height))
 
-        if len(packer.rect_list()) == len(rectangles):
-            print(f"All rectangles packed in {max_bins} bins")
-            break
-        else:
-            print(f"Could not pack all rectangles in {max_bins} bins")
-            max_bins += 1
+    # Two parts that are wider than half the bin and taller than half the bin in every
+    # orientation they fit in would always overlap, so each of them needs its own bin.
+    big_parts = 0
+    for r in rectangles:
+        orientations = [(w, h) for w, h in ((r[0], r[1]), (r[1], r[0])) if w <= bin_width and h <= bin_height]
+        if orientations and all(2 * w > bin_width and 2 * h > bin_height for w, h in orientations):
+            big_parts += 1
 
+    return max(1, area_bound, big_parts)
+
+def _pack_attempt(rectangles, bin_size, max_bins, sort='AREA', algo='MaxRectsBssf', bin_algo='BBF'):
+    # The configuration is given by rectpack names, e.g. ('AREA', 'MaxRectsBssf', 'BBF')
+    import rectpack
+    packer = rectpack.newPacker(rotation=True, bin_algo=getattr(rectpack.PackingBin, bin_algo),
+                                pack_algo=getattr(rectpack, algo), sort_algo=getattr(rectpack, 'SORT_' + sort))
+    for r in rectangles:
+        packer.add_rect(width=r[0], height=r[1], rid=r[3])
+    packer.add_bin(width=bin_size[0], height=bin_size[1], count=max_bins)
+    packer.pack()
     return packer
 
+def _print_attempt(packer, rectangles, max_bins):
+    print(f"\nTrying with {max_bins} bins:")
+    rectangles_dict = {r[3]: r for r in rectangles}
+    for rect in packer.rect_list():
+        b, x, y, w, h, rid = rect
+        if rid in rectangles_dict:
+            rect_data = rectangles_dict[rid]
+            print(f"Rectangle {rid} (type {rect_data[2]}, {rect_data[0]}, {rect_data[1]}) is packed in bin {b} at ({x}, {y}), rotated: {w != rect_data[0]}")
+        else:
+            print(f"Rectangle {rid} not found in the original list")
+
+def _fits_mask(rectangles, bin_size, rotation=True):
+    dims = np.array([(r[0], r[1]) for r in rectangles], dtype=float).reshape(-1, 2)
+    fits = (dims[:, 0] <= bin_size[0]) & (dims[:, 1] <= bin_size[1])
+    if rotation:
+        fits |= (dims[:, 1] <= bin_size[0]) & (dims[:, 0] <= bin_size[1])
+    return fits
+
+def find_oversized(rectangles, bin_size, rotation=True):
+    # Parts that do not fit an empty bin in any allowed orientation can never be packed
+    fits = _fits_mask(rectangles, bin_size, rotation)
+    return [rectangles[i] for i in np.flatnonzero(~fits)]
+
+def _block_shape(width, height, count, bin_size, max_block_fraction):
+    # Pick the cols x rows grid of identical pieces that tiles the bin with the least
+    # leftover along both edges, staying below max_block_fraction of the bin area;
+    # among equally good tilings take the one with the most pieces.
+    best = None
+    max_block_area = max_block_fraction * bin_size[0] * bin_size[1]
+    for pw, ph in ((width, height), (height, width)):
+        for cols in range(1, min(count, int(bin_size[0] // pw)) + 1):
+            for rows in range(1, min(count // cols, int(bin_size[1] // ph)) + 1):
+                if cols * pw * rows * ph > max_block_area:
+                    break
+                waste = (bin_size[0] % (cols * pw)) / bin_size[0] + (bin_size[1] % (rows * ph)) / bin_size[1]
+                key = (-round(waste, 2), cols * rows)
+                if best is None or key > best[0]:
+                    best = (key, (pw, ph, cols, rows))
+    return best[1] if best else None
+
+def make_blocks(rectangles, bin_size, max_block_fraction=0.1):
+    # Replace runs of identical parts by composite cols x rows blocks. Returns the items
+    # to pack and a map from block rid to (piece_w, piece_h, cols, rows, ids).
+    items = []
+    blocks = {}
+    for width, height, type_id, ids in group_rectangles(rectangles):
+        shape = _block_shape(width, height, len(ids), bin_size, max_block_fraction)
+        per_block = shape[2] * shape[3] if shape else 1
+        if per_block < 2:
+            items.extend((width, height, type_id, id) for id in ids)
+            continue
+        pw, ph, cols, rows = shape
+        # Keep one block's worth as single pieces so they can fill the gaps between blocks
+        n_blocks = max(0, len(ids) // per_block - 1)
+        for k in range(n_blocks):
+            rid = ('block', len(blocks))
+            blocks[rid] = (pw, ph, cols, rows, ids[k * per_block:(k + 1) * per_block])
+            items.append((cols * pw, rows * ph, type_id, rid))
+        items.extend((width, height, type_id, id) for id in ids[n_blocks * per_block:])
+    return items, blocks
+
+class PackingResult:
+    # Behaves like the rectpack packer for the exporters (len() and rect_list()) and
+    # additionally records which parts were left out. Only plain tuples are kept, so a
+    # result can be pickled and handed to other processes.
+    def __init__(self, rects, bin_count, unpacked, oversized, blocks=None, config=None):
+        self.rects = rects
+        self.bin_count = bin_count
+        self.unpacked = unpacked
+        self.oversized = oversized
+        self.blocks = blocks or {}
+        self.config = config
+        self.timed_out = False  # the time limit cut the search short
+
+    @property
+    def complete(self):
+        return not self.unpacked
+
+    def __len__(self):
+        return self.bin_count
+
+    def rect_list(self):
+        if not self.blocks:
+            return list(self.rects)
+        rects = []
+        for b, x, y, w, h, rid in self.rects:
+            if rid not in self.blocks:
+                rects.append((b, x, y, w, h, rid))
+                continue
+            pw, ph, cols, rows, ids = self.blocks[rid]
+            if w != cols * pw or h != rows * ph:
+                pw, ph, cols, rows = ph, pw, rows, cols
+            for k, id in enumerate(ids):
+                col, row = divmod(k, rows)
+                rects.append((b, x + col * pw, y + row * ph, pw, ph, id))
+        return rects
+
+def _drop_oversized(rectangles, bin_size):
+    oversized = find_oversized(rectangles, bin_size)
+    if oversized:
+        print(f"{len(oversized)} rectangles are larger than the {bin_size[0]}x{bin_size[1]} bin and are skipped:")
+        for r in oversized:
+            print(f"Rectangle (type {r[2]}, id {r[3]}, {r[0]}, {r[1]}) does not fit")
+        oversized_ids = {r[3] for r in oversized}
+        rectangles = [r for r in rectangles if r[3] not in oversized_ids]
+    return rectangles, oversized
+
+def _make_result(rects, bin_count, rectangles, oversized, blocks, config=None):
+    result = PackingResult(rects, bin_count, [], [r[3] for r in oversized], blocks, config)
+    packed_ids = {r[5] for r in result.rect_list()}
+    result.unpacked = [r[3] for r in oversized] + [r[3] for r in rectangles if r[3] not in packed_ids]
+    return result
+
+def pack_rectangles(rectangles, bin_size, verbose=False, max_attempts=2, time_limit=None, use_blocks=False):
+    start_time = time.monotonic()
+
+    rectangles, oversized = _drop_oversized(rectangles, bin_size)
+    if not rectangles:
+        return _make_result([], 0, rectangles, oversized, {})
+
+    lower_bound = estimate_min_bins(rectangles, bin_size)
+
+    # Optionally pack identical parts as composite blocks; they are expanded again in rect_list()
+    items, blocks = make_blocks(rectangles, bin_size) if use_blocks else (rectangles, {})
+
+    # The offline packer only opens a new bin once the open ones are full, so a capped
+    # bin supply can only drop parts, never save a bin. One pack with an unlimited
+    # supply therefore gives the answer of the old "+1 bin and repack" loop directly
+    # and is our upper bound. With oversized parts removed it always terminates.
+    packer = _pack_attempt(items, bin_size, float('inf'))
+    attempts = 1
+    if verbose:
+        _print_attempt(packer, items, len(packer))
+
+    # If the bound is not reached, give a second sort order one bin less; the long-side
+    # order often closes the gap left by the area order.
+    out_of_time = time_limit is not None and time.monotonic() - start_time >= time_limit
+    if len(packer) > lower_bound and attempts < max_attempts and not out_of_time:
+        candidate = _pack_attempt(items, bin_size, len(packer) - 1, sort='LSIDE')
+        attempts += 1
+        if verbose:
+            _print_attempt(candidate, items, len(packer) - 1)
+        if len(candidate.rect_list()) == len(packer.rect_list()):
+            packer = candidate
+
+    result = _make_result(packer.rect_list(), len(packer), rectangles, oversized, blocks)
+    result.timed_out = len(packer) > lower_bound and out_of_time  # the second attempt was skipped
+
+    if verbose:
+        if result.complete:
+            print(f"All rectangles packed in {len(result)} bins (lower bound {lower_bound}, {attempts} attempts)")
+        else:
+            print(f"Could not pack {len(result.unpacked)} rectangles in {len(result)} bins")
+
+    return result
+
+# Configurations tried by pack_portfolio: (pack algorithm, sort order, bin selection),
+# given by name so they can be sent to worker processes
+PORTFOLIO_ALGOS = ['MaxRectsBssf', 'MaxRectsBaf', 'MaxRectsBlsf', 'MaxRectsBl',
+                   'SkylineBlWm', 'SkylineMwfWm', 'GuillotineBssfSas', 'GuillotineBafSlas']
+PORTFOLIO_SORTS = ['AREA', 'LSIDE', 'SSIDE', 'PERI']
+PORTFOLIO_BINS = ['BBF', 'BFF']
+
+def portfolio_configs(algos=PORTFOLIO_ALGOS, sorts=PORTFOLIO_SORTS, bins=PORTFOLIO_BINS):
+    return [(algo, sort, bin_algo) for algo in algos for sort in sorts for bin_algo in bins]
+
+def _run_config(items, bin_size, config):
+    algo, sort, bin_algo = config
+    packer = _pack_attempt(items, bin_size, float('inf'), sort=sort, algo=algo, bin_algo=bin_algo)
+    return config, packer.rect_list(), len(packer)
+
+def _portfolio_key(outcome):
+    # Fewest bins first; among equal bin counts prefer the layout whose emptiest bin holds
+    # the least, i.e. the fullest other bins and the largest reusable remnant.
+    config, rects, bin_count = outcome
+    bin_areas = [0] * bin_count
+    for b, x, y, w, h, rid in rects:
+        bin_areas[b] += w * h
+    return -len(rects), bin_count, min(bin_areas, default=0)
+
+def pack_portfolio(rectangles, bin_size, configs=None, time_limit=None, workers=None, use_blocks=False, verbose=False):
+    rectangles, oversized = _drop_oversized(rectangles, bin_size)
+    if not rectangles:
+        return _make_result([], 0, rectangles, oversized, {})
+
+    items, blocks = make_blocks(rectangles, bin_size) if use_blocks else (rectangles, {})
+    configs = configs or portfolio_configs()
+
+    # Finished configurations arrive on a queue. Once the budget is spent (or, if nothing
+    # finished in time, once the first one does) leaving the with block terminates the
+    # pool, so configurations still running or queued die with it instead of holding the
+    # process open until the interpreter joins them at exit.
+    finished = queue.Queue()
+    outcomes = []
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    with multiprocessing.Pool(workers) as pool:
+        for config in configs:
+            pool.apply_async(_run_config, (items, bin_size, config), callback=finished.put,
+                             error_callback=finished.put)
+        while len(outcomes) < len(configs):
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            if outcomes and timeout == 0:
+                break
+            try:
+                outcome = finished.get(timeout=timeout or None)
+            except queue.Empty:
+                continue
+            if isinstance(outcome, BaseException):
+                raise outcome
+            outcomes.append(outcome)
+
+    config, rects, bin_count = min(outcomes, key=_portfolio_key)
+    print(f"Portfolio: {len(outcomes)} of {len(configs)} configurations finished, "
+          f"best {'/'.join(config)} with {bin_count} bins")
+    if verbose:
+        for outcome in sorted(outcomes, key=_portfolio_key):
+            print(f"  {outcome[0]}: {outcome[2]} bins")
+
+    result = _make_result(rects, bin_count, rectangles, oversized, blocks, config)
+    result.timed_out = len(outcomes) < len(configs)
+    return result
+
+def _part_block(doc, type_id, width, height):
+    # Each part outline is defined once as a block and placed with INSERTs. A type can
+    # come in several sizes (e.g. from a --stream feed), so the size is part of the name.
+    name = f'PART_{type_id}_{width}x{height}'
+    if name in doc.blocks:
+        return name
+    layer_name = f'type_{type_id}'
+    if layer_name not in doc.layers:
+        doc.layers.new(name=layer_name)
+    block = doc.blocks.new(name=name)
+    block.add_lwpolyline([(0, 0), (width, 0), (width, height), (0, height), (0, 0)], dxfattribs={'layer': layer_name})
+    return name
+
 def save_to_dxf(packer, rectangles, bin_size, filename):
+    import ezdxf
     doc = ezdxf.new(setup=True)
     msp = doc.modelspace()
+    rectangles_dict = {r[3]: r for r in rectangles}
 
-    bin_offset_x = 0
-    for i in range(len(packer)):
-        bin_rects = [r for r in packer.rect_list() if r[0] == i]
+    # rect_list() is ordered by bin, so each bin is written as soon as its placements are read
+    for i, bin_rects in itertools.groupby(sorted(packer.rect_list(), key=operator.itemgetter(0)),
+                                          key=operator.itemgetter(0)):
+        bin_offset_x = i * (bin_size[0] + 100)
         layer = doc.layers.new(name=f'bin_{i}')
-        bin_boundary = msp.add_lwpolyline(
+        msp.add_lwpolyline(
             [(bin_offset_x, 0), (bin_offset_x + bin_size[0], 0), (bin_offset_x + bin_size[0], bin_size[1]),
              (bin_offset_x, bin_size[1]), (bin_offset_x, 0)], dxfattribs={'layer': layer.dxf.name})
 
-        rectangles_dict = {r[3]: r for r in rectangles}
-        for rect in bin_rects:
-            b, x, y, w, h, rid = rect
-
-            if rid in rectangles_dict:
-                rect_data = rectangles_dict[rid]
-                type_id = rect_data[2]
-                layer_name = f'type_{type_id}'
-                if layer_name not in doc.layers:
-                    doc.layers.new(name=layer_name)
-
-                msp.add_lwpolyline([(bin_offset_x + x, y), (bin_offset_x + x + w, y), (bin_offset_x + x + w, y + h),
-                                    (bin_offset_x + x, y + h), (bin_offset_x + x, y)], dxfattribs={'layer': layer_name})
-
-                text = msp.add_text(str(rid), dxfattribs={
-                    'layer': layer_name,
-                    'height': min(w, h) / 2,
-                    'rotation': 90 if w < h else 0
-                })
-                text.dxf.insert = (bin_offset_x + x + w / 2, y + h / 2)
-                text.dxf.halign = 1
-                text.dxf.valign = 2
-
-        bin_offset_x += bin_size[0] + 100
+        for b, x, y, w, h, rid in bin_rects:
+            if rid not in rectangles_dict:
+                continue
+            width, height, type_id = rectangles_dict[rid][:3]
+            block_name = _part_block(doc, type_id, width, height)
+            if (w, h) == (width, height):
+                insert, rotation = (bin_offset_x + x, y), 0
+            else:
+                # Rotated 90 degrees counter-clockwise about the insert point
+                insert, rotation = (bin_offset_x + x + w, y), 90
+            msp.add_blockref(block_name, insert, dxfattribs={'layer': f'type_{type_id}', 'rotation': rotation})
+
+            # A plain TEXT for the piece ID is smaller and faster to write than a block attribute
+            text = msp.add_text(str(rid), dxfattribs={
+                'layer': f'type_{type_id}',
+                'height': min(w, h) / 2,
+                'rotation': 90 if w < h else 0
+            })
+            text.dxf.insert = (bin_offset_x + x + w / 2, y + h / 2)
+            text.dxf.halign = 1
+            text.dxf.valign = 2
 
     doc.saveas(filename)
 
-def save_to_database(packer, rectangles, bin_size, db_name):
-    conn = sqlite3.connect(db_name)
-    c = conn.cursor()
-
-    c.execute('''CREATE TABLE IF NOT EXISTS Plate_table_output
-                 (Bin_ID INTEGER,
-                 Utilization REAL,
-                 Type INTEGER,
-                 Width REAL,
-                 Height REAL,
-                 Is_Rotated INTEGER,
-                 Bottom_Left_X REAL,
-                 Bottom_Left_Y REAL)''')
-
+def _database_rows(packer, rectangles, bin_size, bin_offset=0):
+    # Rows for Plate_table_output and Packing_placement; bin_offset shifts the Bin_ID
     rectangles_dict = {r[3]: r for r in rectangles}
-    for i in range(len(packer)):
-        bin_rects = [r for r in packer.rect_list() if r[0] == i]
-        bin_utilization = sum(r[2] * r[3] for r in bin_rects) / (bin_size[0] * bin_size[1])
+    bin_area = bin_size[0] * bin_size[1]
+    all_rects = packer.rect_list()
 
-        for rect in bin_rects:
-            b, x, y, w, h, rid = rect
+    used_area = [0] * len(packer)
+    for b, x, y, w, h, rid in all_rects:
+        used_area[b] += w * h
+
+    output_rows = []
+    placement_rows = []
+    for b, x, y, w, h, rid in all_rects:
+        if rid not in rectangles_dict:
+            continue
+        width, height, type_id = rectangles_dict[rid][:3]
+        output_rows.append((b + bin_offset, used_area[b] / bin_area, type_id, w, h, 1 if w < h else 0, x, y))
+        placement_rows.append((b + bin_offset, str(rid), type_id, w, h, 1 if (w, h) != (width, height) else 0, x, y))
+    return output_rows, placement_rows
+
+def save_to_database(packer, rectangles, bin_size, db_name, released_bins=()):
+    output_rows, placement_rows = _database_rows(packer, rectangles, bin_size)
+    return plate_storage.write_job(db_name, bin_size, len(packer), output_rows, placement_rows, released_bins)
+
+class PatternResult:
+    # Sheets are stored as (layout, multiplicity) patterns with layout entries
+    # (x, y, w, h, type_index); piece IDs are only handed out in rect_list().
+    def __init__(self, patterns, part_types, unpacked, oversized):
+        self.patterns = patterns
+        self.part_types = part_types
+        self.unpacked = unpacked
+        self.oversized = oversized
+        self.timed_out = False
+
+    @property
+    def complete(self):
+        return not self.unpacked
+
+    def __len__(self):
+        return sum(multiplicity for _, multiplicity in self.patterns)
+
+    def rect_list(self):
+        id_iters = [iter(t[3]) for t in self.part_types]
+        rects = []
+        b = 0
+        for layout, multiplicity in self.patterns:
+            for _ in range(multiplicity):
+                for x, y, w, h, i in layout:
+                    rects.append((b, x, y, w, h, next(id_iters[i])))
+                b += 1
+        return rects
+
+def _pack_one_sheet(part_types, remaining, bin_size):
+    import rectpack
+    packer = rectpack.newPacker(rotation=True, pack_algo=rectpack.MaxRectsBssf)
+    bin_area = bin_size[0] * bin_size[1]
+    for i, t in enumerate(part_types):
+        # No point offering more pieces of a type than could fit one sheet by area
+        for _ in range(min(remaining[i], int(bin_area // (t[0] * t[1])))):
+            packer.add_rect(width=t[0], height=t[1], rid=i)
+    packer.add_bin(width=bin_size[0], height=bin_size[1])
+    packer.pack()
+    return [(x, y, w, h, rid) for b, x, y, w, h, rid in packer.rect_list()]
+
+def pack_part_types(part_types, bin_size, verbose=False, time_limit=None):
+    start_time = time.monotonic()
+
+    fits = _fits_mask(part_types, bin_size)
+    oversized = [t for i, t in enumerate(part_types) if not fits[i]]
+    remaining = [len(t[3]) if fits[i] else 0 for i, t in enumerate(part_types)]
+    if oversized:
+        print(f"{len(oversized)} part types are larger than the {bin_size[0]}x{bin_size[1]} bin and are skipped:")
+        for t in oversized:
+            print(f"Type {t[2]} ({t[0]}, {t[1]}) does not fit, {len(t[3])} pieces")
+
+    # Fill one sheet from the remaining demand, then repeat that layout as often as the
+    # demand allows; the packer only ever sees one sheet's worth of pieces at a time.
+    patterns = []
+    timed_out = False
+    while any(remaining):
+        if time_limit is not None and time.monotonic() - start_time >= time_limit:
+            timed_out = True
+            break
+        layout = _pack_one_sheet(part_types, remaining, bin_size)
+        if not layout:
+            break
+        demand = {}
+        for x, y, w, h, i in layout:
+            demand[i] = demand.get(i, 0) + 1
+        multiplicity = min(remaining[i] // count for i, count in demand.items())
+        for i, count in demand.items():
+            remaining[i] -= multiplicity * count
+        patterns.append((layout, multiplicity))
+        if verbose:
+            used_area = sum(w * h for x, y, w, h, i in layout)
+            type_counts = {part_types[i][2]: count for i, count in demand.items()}
+            print(f"Pattern {len(patterns) - 1} x{multiplicity}: {type_counts}, "
+                  f"utilization {used_area / (bin_size[0] * bin_size[1]) * 100:.2f}%")
+
+    oversized_ids = [rid for t in oversized for rid in t[3]]
+    unpacked = oversized_ids + [rid for i, t in enumerate(part_types)
+                                if fits[i] and remaining[i] for rid in t[3][len(t[3]) - remaining[i]:]]
+
+    result = PatternResult(patterns, part_types, unpacked, oversized_ids)
+    result.timed_out = timed_out
+    return result
+
+def write_report(packer, rectangles, bin_size, filename=None):
+    # The report is built as one string so it does not interleave with other writers
+    all_rects = packer.rect_list()
+    rectangles_dict = {r[3]: r for r in rectangles}  # 创建一个字典,将矩形ID映射到矩形元组
+    bin_area = bin_size[0] * bin_size[1]
+    bins = [[] for _ in range(len(packer))]
+    for rect in all_rects:
+        bins[rect[0]].append(rect)
+
+    lines = [f"Final result: Packed {len(all_rects)} rectangles in {len(packer)} bins:"]
+    for i, bin_rects in enumerate(bins):
+        packed_area = sum(r[3] * r[4] for r in bin_rects)
+        lines.append(f"\nBin {i} - Utilization: {packed_area / bin_area * 100:.2f}%")
+        lines.append("Contains rectangles:")
+        type_counts = {}
+        for b, x, y, w, h, rid in bin_rects:
             if rid in rectangles_dict:
-                rect_data = rectangles_dict[rid]
-                type_id = rect_data[2]
-                is_rotated = 1 if w < h else 0
+                type_counts.setdefault(rectangles_dict[rid][2], []).append(rid)
+        for type_id, rect_ids in type_counts.items():
+            lines.append(f"Type {type_id}: {rect_ids}")
 
-                c.execute("INSERT INTO Plate_table_output VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
-                          (i, bin_utilization, type_id, w, h, is_rotated, x, y))
+    if getattr(packer, 'config', None):
+        lines.append(f"\nBest configuration: {'/'.join(packer.config)}")
 
-    conn.commit()
-    conn.close()
+    unpacked_ids = set(packer.unpacked)
+    unpacked_rects = [r for r in rectangles if r[3] in unpacked_ids]
+    lines.append(f"\n{len(unpacked_rects)} rectangles could not be packed:")
+    for rect in unpacked_rects:
+        lines.append(f"Rectangle (type {rect[2]}, id {rect[3]}, {rect[0]}, {rect[1]}) is not packed")
 
-#通过外部args参数传入 bin_width,bin_height
+    text = "\n".join(lines)
+    if filename is None:
+        print(text)
+    else:
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+
+def _bin_placements(packer):
+    bins = [[] for _ in range(len(packer))]
+    for b, x, y, w, h, rid in packer.rect_list():
+        bins[b].append((x, y, w, h, rid))
+    return bins
+
+def save_layout_image(packer, bin_size, filename, columns=None):
+    # All bins tiled into one contact sheet
+    import layout_render
+    layout_render.render_contact_sheet(_bin_placements(packer), bin_size, filename, columns=columns,
+                                       facecolor='blue')
+
+def save_bin_images(packer, bin_size, pattern, workers=None):
+    # One image per bin, rendered in worker processes
+    import layout_render
+    return layout_render.render_bins(_bin_placements(packer), bin_size, pattern, facecolor='blue', workers=workers)
+
+def snapshot_result(packer):
+    # Frozen copy with blocks and patterns already expanded, safe to share between writers
+    return PackingResult(tuple(packer.rect_list()), len(packer), tuple(packer.unpacked),
+                         tuple(packer.oversized), config=getattr(packer, 'config', None))
+
+def _timed(func, *args):
+    start = time.monotonic()
+    value = func(*args)
+    return value, time.monotonic() - start
+
+def export_results(packer, rectangles, bin_size, output_dxf=None, output_db=None, output_image=None,
+                   bin_image_pattern=None, report=True, use_processes=False, workers=None, released_bins=()):
+    result = snapshot_result(packer)
+    rectangles = tuple(rectangles)
+
+    tasks = []
+    if output_dxf:
+        tasks.append((f"DXF {output_dxf}", save_to_dxf, (result, rectangles, bin_size, output_dxf)))
+    if output_db:
+        tasks.append((f"database {output_db}", save_to_database,
+                      (result, rectangles, bin_size, output_db, tuple(released_bins))))
+    if report:
+        tasks.append(("report", write_report, (result, rectangles, bin_size)))
+    if output_image:
+        tasks.append((f"image {output_image}", save_layout_image, (result, bin_size, output_image)))
+    if bin_image_pattern:
+        tasks.append((f"images {bin_image_pattern}", save_bin_images, (result, bin_size, bin_image_pattern, workers)))
+
+    start_time = time.monotonic()
+    outcomes = {}
+    executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as pool:
+        futures = {pool.submit(_timed, func, *args): name for name, func, args in tasks}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                value, elapsed = future.result()
+                outcomes[name] = (True, value, elapsed)
+            except Exception as e:
+                outcomes[name] = (False, e, None)
+
+    failed = {name: outcome for name, outcome in outcomes.items() if not outcome[0]}
+    print(f"\nExport finished in {time.monotonic() - start_time:.2f}s: "
+          f"{len(outcomes) - len(failed)} succeeded, {len(failed)} failed")
+    for name, (ok, error, elapsed) in failed.items():
+        print(f"  {name} failed: {error!r}")
+    return outcomes
+
+# 默认板材尺寸，可通过 --width/--height 参数覆盖
 bin_width = 1000
 bin_height = 1000
 
+ALGORITHMS = ['patterns', 'maxrects', 'blocks', 'portfolio']
+
+def _run_algorithm(algorithm, part_types, rectangles, bin_size, time_limit=None, workers=None):
+    if algorithm == 'patterns':
+        return pack_part_types(part_types, bin_size, time_limit=time_limit)
+    if algorithm == 'portfolio':
+        return pack_portfolio(rectangles, bin_size, time_limit=time_limit, workers=workers)
+    return pack_rectangles(rectangles, bin_size, time_limit=time_limit, use_blocks=algorithm == 'blocks')
+
+def _prepend_sheets(sheets, packer):
+    # Library sheets become bins 0..n-1, followed by the packer's own bins
+    rects = [(b, x, y, w, h, rid) for b, sheet in enumerate(sheets) for x, y, w, h, rid in sheet]
+    rects.extend((b + len(sheets), x, y, w, h, rid) for b, x, y, w, h, rid in packer.rect_list())
+    result = PackingResult(rects, len(sheets) + len(packer), list(packer.unpacked), list(packer.oversized),
+                           config=getattr(packer, 'config', None))
+    result.timed_out = packer.timed_out
+    return result
+
+def pack_job(part_types, rectangles, bin_size, algorithm='patterns', time_limit=None, workers=None, cache=None,
+             library=None):
+    # With a ResultCache, an identical job (same parts, sheet, algorithm and parameters)
+    # returns the stored placements without packing again. With a PatternLibrary, known
+    # sheet patterns that fit the order are cut first and only the rest is packed; the
+    # well-filled sheets of the result are added to the library. Results cut short by the
+    # time limit or built on library sheets depend on more than the key and are not cached.
+    if cache is not None:
+        key = result_cache.job_key(rectangles, bin_size, algorithm,
+                                   {'time_limit': time_limit, 'workers': workers, 'library': library is not None})
+        hit = cache.get(key, rectangles)
+        if hit is not None:
+            rects, bin_count, unpacked, oversized, config = hit
+            print(f"Reusing cached layout with {bin_count} bins")
+            return PackingResult(rects, bin_count, unpacked, oversized, config=config)
+
+    sheets = []
+    if library is not None:
+        sheets, remainder = library.match(rectangles, bin_size)
+        if sheets:
+            print(f"Cut {len(sheets)} sheets from the pattern library, {len(remainder)} rectangles left to pack")
+            part_types = group_rectangles(remainder)
+    packer = _run_algorithm(algorithm, part_types, remainder if sheets else rectangles, bin_size,
+                            time_limit, workers)
+    if sheets:
+        packer = _prepend_sheets(sheets, packer)
+
+    if library is not None:
+        library.add_layouts(packer, rectangles, bin_size)
+    if cache is not None and not sheets and not packer.timed_out:
+        cache.put(key, rectangles, packer)
+    return packer
 
-# 主程序
-if __name__ == "__main__":
-    num_types = 3
-    min_size = 50
-    max_size = 200
-    min_count = 1
-    max_count = 5
-    bin_size = (bin_width, bin_height)
-    db_file = 'D:\Program Files\GBS_Software\CreateTeklaCNC\Tekla_NCX_database.db'
-    output_dxf = 'packed_rectangles.dxf'
-    output_db = 'packing_results.db'
-
-    #rectangles = generate_rectangles(num_types, min_size, max_size, min_count, max_count)
-    rectangles = read_rectangles_from_db(db_file)  # 从数据库中读取矩形数据
+def load_job(db_name, job_id=None):
+    # A stored job as (job row, placed rects, the rectangles they came from, released bins);
+    # job_id None means the latest job
+    with plate_storage.ResultsReader(db_name, pool_size=1) as reader:
+        job = reader.job(job_id)
+        if job is None:
+            raise ValueError(f"No packing job found in {db_name}")
+        rows = reader.placements(job[0])
+        released = reader.released_bins(job[0])
+    placed_rects = [(b, x, y, w, h, rid) for _, b, rid, type_id, w, h, rotated, x, y in rows]
+    placed = [((h, w) if rotated else (w, h)) + (type_id, rid) for _, b, rid, type_id, w, h, rotated, x, y in rows]
+    return job, placed_rects, placed, released
+
+def _place_in_grid(grid, failed, width, height):
+    for w, h in ((width, height), (height, width)):
+        if failed.dominated(w, h):
+            continue
+        position = grid.find_position(w, h)
+        if position:
+            grid.mark_occupied(position[0], position[1], w, h)
+            return position[0], position[1], w, h
+        failed.add(w, h)
+    return None
+
+def pack_incremental(rectangles, bin_size, placed_rects, bin_count, released=(), algorithm='patterns',
+                     time_limit=None, workers=None):
+    # Add the rectangles that are not in placed_rects to an earlier layout. New parts go
+    # into the free space of the unreleased bins first, largest first; released bins are
+    # left untouched and only the overflow is packed onto new bins after the existing ones.
+    placed_ids = {str(r[5]) for r in placed_rects}
+    new = [r for r in rectangles if str(r[3]) not in placed_ids]
+    released = set(released)
+    open_bins = {b: (CornerPointGrid(*bin_size), FailedSizeCache()) for b in range(bin_count) if b not in released}
+    for b, x, y, w, h, rid in placed_rects:
+        if b in open_bins:
+            open_bins[b][0].mark_occupied(x, y, w, h)
+
+    added = []
+    overflow = []
+    for r in sorted(new, key=lambda r: r[0] * r[1], reverse=True):
+        for b, (grid, failed) in open_bins.items():
+            spot = _place_in_grid(grid, failed, r[0], r[1])
+            if spot:
+                added.append((b,) + spot + (r[3],))
+                break
+        else:
+            overflow.append(r)
+    print(f"{len(new)} new rectangles: {len(added)} placed on {len(open_bins)} open bins, "
+          f"{len(overflow)} need new bins ({len(released)} bins released and kept)")
+
+    rects = list(placed_rects) + added
+    new_bins = 0
+    unpacked = []
+    oversized = []
+    if overflow:
+        packer = _run_algorithm(algorithm, group_rectangles(overflow), overflow, bin_size, time_limit, workers)
+        rects.extend((b + bin_count, x, y, w, h, rid) for b, x, y, w, h, rid in packer.rect_list())
+        new_bins, unpacked, oversized = len(packer), list(packer.unpacked), list(packer.oversized)
+    return PackingResult(rects, bin_count + new_bins, unpacked, oversized)
+
+def read_parts_stream(lines):
+    # Parts from a text feed, one "width height type id" per line (spaces or commas)
+    for line in lines:
+        fields = line.replace(',', ' ').split()
+        if len(fields) < 4:
+            continue
+        yield _dimension(float(fields[0])), _dimension(float(fields[1])), fields[2], fields[3]
+
+def _close_sheet(sheet):
+    packing, parts = sheet
+    return PackingResult([(0, x, y, w, h, rid) for x, y, w, h, rid in packing.rect_list()], 1, [], []), parts
+
+def stream_pack(parts, bin_size, max_open=4, close_at=0.9, pack_algo='MaxRectsBssf'):
+    # Online packing: parts (width, height, type_id, id) are placed as they arrive, each on
+    # the open sheet where it fits best, with at most max_open sheets open. A sheet is
+    # closed once it reaches close_at utilization or cannot take the smallest part seen so
+    # far; a part that fits no open sheet when all are in use closes the fullest one.
+    # Yields each closed sheet as (single-bin PackingResult, parts on it).
+    import rectpack
+    algo = getattr(rectpack, pack_algo)
+    bin_area = bin_size[0] * bin_size[1]
+    open_sheets = []  # [rectpack bin, parts]
+    smallest = None
+    for part in parts:
+        w, h = part[0], part[1]
+        if not ((w <= bin_size[0] and h <= bin_size[1]) or (h <= bin_size[0] and w <= bin_size[1])):
+            print(f"Rectangle (type {part[2]}, id {part[3]}, {w}, {h}) does not fit and is skipped")
+            continue
+        if smallest is None or w * h < smallest[0] * smallest[1]:
+            smallest = (w, h)
+
+        fits = [(sheet[0].fitness(w, h), k) for k, sheet in enumerate(open_sheets)]
+        fits = [fit for fit in fits if fit[0] is not None]
+        if fits:
+            k = min(fits)[1]
+        else:
+            if len(open_sheets) >= max_open:
+                fullest = max(range(len(open_sheets)), key=lambda k: open_sheets[k][0].used_area())
+                yield _close_sheet(open_sheets.pop(fullest))
+            open_sheets.append([algo(bin_size[0], bin_size[1], rot=True), []])
+            k = len(open_sheets) - 1
+
+        packing, sheet_parts = open_sheets[k]
+        packing.add_rect(w, h, part[3])
+        sheet_parts.append(part)
+        if packing.used_area() >= close_at * bin_area or packing.fitness(*smallest) is None:
+            yield _close_sheet(open_sheets.pop(k))
+
+    for sheet in open_sheets:
+        yield _close_sheet(sheet)
+
+def export_stream(sheets, bin_size, output_db=None, dxf_pattern=None):
+    # Writes every sheet as soon as it is closed: as the next bin of one job in output_db
+    # and/or to its own DXF file (dxf_pattern is formatted with the sheet number)
+    writer = plate_storage.JobWriter(output_db, bin_size) if output_db else None
+    bin_area = bin_size[0] * bin_size[1]
+    count = 0
+    try:
+        for n, (sheet, parts) in enumerate(sheets):
+            if writer is not None:
+                writer.add_bin(*_database_rows(sheet, parts, bin_size, bin_offset=n))
+            if dxf_pattern:
+                save_to_dxf(sheet, parts, bin_size, dxf_pattern.format(n))
+            used_area = sum(r[3] * r[4] for r in sheet.rect_list())
+            print(f"Sheet {n} closed: {len(parts)} rectangles, utilization {used_area / bin_area * 100:.2f}%")
+            count += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return (writer.job_id if writer is not None else None), count
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Nest rectangular parts onto sheets and export the layout.")
+    parser.add_argument('db_file', nargs='?',
+                        help="input database with Plate_table_one; with --stream, '-' reads parts from stdin")
+    parser.add_argument('--random', type=int, metavar='TYPES', help="nest TYPES random part types instead of a database")
+    parser.add_argument('--width', type=int, default=bin_width, help="sheet width (default %(default)s)")
+    parser.add_argument('--height', type=int, default=bin_height, help="sheet height (default %(default)s)")
+    parser.add_argument('--algorithm', choices=ALGORITHMS, default='patterns',
+                        help="patterns: repeat whole-sheet patterns per part type; maxrects: rectpack with a "
+                             "second sort order; blocks: maxrects on pre-built blocks of identical parts; "
+                             "portfolio: best of many rectpack configurations (default %(default)s)")
+    parser.add_argument('--time-limit', type=float, help="seconds allowed for packing")
+    parser.add_argument('--workers', type=int, help="worker processes for the portfolio and for rendering")
+    parser.add_argument('--dxf', default='packed_rectangles.dxf', help="DXF output, '' to skip (default %(default)s)")
+    parser.add_argument('--output-db', default='packing_results.db',
+                        help="results database, '' to skip (default %(default)s)")
+    parser.add_argument('--image', help="contact-sheet image of all sheets")
+    parser.add_argument('--bin-images', metavar='PATTERN', help="one image per sheet, e.g. bin_{}.png")
+    parser.add_argument('--no-report', action='store_true', help="do not print the per-sheet report")
+    parser.add_argument('--cache', default='nesting_cache.db',
+                        help="result cache database, '' to always repack (default %(default)s)")
+    parser.add_argument('--pattern-library', default='sheet_patterns.db',
+                        help="sheet pattern library shared between jobs, '' to disable (default %(default)s)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="add the parts not yet placed to the latest job (or --job) in --output-db, "
+                             "keeping released sheets unchanged")
+    parser.add_argument('--job', type=int, help="job to extend or release (default: latest)")
+    parser.add_argument('--release', type=int, nargs='+', metavar='BIN',
+                        help="mark sheets of the job as released to the cutter and exit")
+    parser.add_argument('--stream', action='store_true',
+                        help="pack parts one at a time as they arrive and write each sheet when it closes")
+    parser.add_argument('--max-open', type=int, default=4, help="open sheets in --stream mode (default %(default)s)")
+    parser.add_argument('--close-at', type=float, default=0.9,
+                        help="utilization at which a sheet is closed in --stream mode (default %(default)s)")
+    parser.add_argument('--processes', action='store_true', help="run the exports in processes instead of threads")
+    args = parser.parse_args(argv)
+    if args.db_file is None and args.random is None and args.release is None:
+        parser.error("give an input database or --random TYPES")
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    bin_size = (args.width, args.height)
+
+    if args.release is not None:
+        try:
+            job_id = plate_storage.release_bins(args.output_db, args.job, args.release)
+        except ValueError as e:
+            print(f"Cannot release bins: {e}", file=sys.stderr)
+            return 1
+        print(f"Released bins {args.release} of job {job_id}")
+        return 0
+
+    if args.stream:
+        if args.db_file == '-':
+            parts = read_parts_stream(sys.stdin)
+        elif args.random is not None:
+            parts = iter(generate_rectangles(args.random, 50, 200, 1, 5))
+        else:
+            parts = iter(expand_part_types(read_part_types_from_db(args.db_file)))
+        dxf_pattern = None
+        if args.dxf:
+            stem, dot, suffix = args.dxf.rpartition('.')
+            if '{}' in args.dxf:
+                dxf_pattern = args.dxf
+            else:
+                dxf_pattern = f"{stem}_{{}}.{suffix}" if dot else f"{args.dxf}_{{}}"
+        sheets = stream_pack(parts, bin_size, args.max_open, args.close_at)
+        job_id, count = export_stream(sheets, bin_size, args.output_db or None, dxf_pattern)
+        print(f"{count} sheets written" + (f" to {args.output_db} (job {job_id})" if job_id is not None else ""))
+        return 0
+
+    if args.random is not None:
+        rectangles = generate_rectangles(args.random, 50, 200, 1, 5)
+        part_types = group_rectangles(rectangles)
+    else:
+        part_types = read_part_types_from_db(args.db_file)  # 从数据库中读取矩形数据
+        rectangles = expand_part_types(part_types)
     print(f"Generated {len(rectangles)} rectangles")
 
-    packer = pack_rectangles(rectangles, bin_size)
-
-    #save_to_dxf(packer, rectangles, bin_size, output_dxf)
-    #print(f"Packing results saved to {output_dxf}")
-
-    save_to_database(packer, rectangles, bin_size, output_db)
-    print(f"Packing results saved to {output_db}")
-
-    all_rects = packer.rect_list()
-    print(f"\nFinal result: Packed {len(all_rects)} rectangles in {len(packer)} bins:")
+    released = []
+    if args.incremental:
+        job, placed_rects, placed, released = load_job(args.output_db, args.job)
+        bin_size = (_dimension(job[2]), _dimension(job[3]))  # stored as REAL
+        print(f"Extending job {job[0]} ({job[4]} bins, {len(released)} released)")
+        # Pieces already on a sheet stay there even if they have left the order
+        current_ids = {str(r[3]) for r in rectangles}
+        rectangles = rectangles + [r for r in placed if str(r[3]) not in current_ids]
+        packer = pack_incremental(rectangles, bin_size, placed_rects, job[4], released, args.algorithm,
+                                  args.time_limit, args.workers)
+    else:
+        cache = result_cache.ResultCache(args.cache) if args.cache else None
+        library = pattern_library.PatternLibrary(args.pattern_library) if args.pattern_library else None
+        try:
+            packer = pack_job(part_types, rectangles, bin_size, args.algorithm, args.time_limit, args.workers, cache,
+                              library)
+        finally:
+            for store in (cache, library):
+                if store is not None:
+                    store.close()
+
+    outcomes = export_results(packer, rectangles, bin_size, output_dxf=args.dxf or None,
+                              output_db=args.output_db or None, output_image=args.image,
+                              bin_image_pattern=args.bin_images, report=not args.no_report,
+                              use_processes=args.processes, workers=args.workers, released_bins=released)
+    db_outcome = outcomes.get(f"database {args.output_db}")
+    if db_outcome and db_outcome[0]:
+        print(f"Packing results saved to {args.output_db} (job {db_outcome[1]})")
+    return 0 if all(outcome[0] for outcome in outcomes.values()) else 1
 
-    rectangles_dict = {r[3]: r for r in rectangles}  # 创建一个字典,将矩形ID映射到矩形元组
 
-    for i in range(len(packer)):
-        bin_rects = [r for r in all_rects if r[0] == i]
-        bin_area = bin_size[0] * bin_size[1]
-        packed_area = sum(r[3] * r[4] for r in bin_rects)
-        utilization = packed_area / bin_area * 100
-        print(f"\nBin {i} - Utilization: {utilization:.2f}%")
-        print("Contains rectangles:")
-        type_counts = {}
-        for rect in bin_rects:
-            b, x, y, w, h, rid = rect
-            if rid in rectangles_dict:
-                type_id = rectangles_dict[rid][2]
-                if type_id not in type_counts:
-                    type_counts[type_id] = []
-                type_counts[type_id].append(rid)
-        for type_id, rect_ids in type_counts.items():
-            print(f"Type {type_id}: {rect_ids}")
-
-    unpacked_rects = [r for r in rectangles if r[3] not in [rect[5] for rect in all_rects]]
-    print(f"\n{len(unpacked_rects)} rectangles could not be packed:")
-    for rect in unpacked_rects:
-        print(f"Rectangle (type {rect[2]}, id {rect[3]}, {rect[0]}, {rect[1]}) is not packed")
-
-    if len(packer) == 1:
-        fig, ax = plt.subplots(figsize=(5, 5))
-        for rect in all_rects:
-            b, x, y, w, h, rid = rect
-            ax.add_patch(patches.Rectangle((x, y), w, h, facecolor='blue', edgecolor='black', alpha=0.5))
-        ax.set_title(f"Bin 0")
-        ax.set_xlim(0, bin_size[0])
-        ax.set_ylim(0, bin_size[1])
-        ax.set_aspect('equal')
-    else:
-        fig, axs = plt.subplots(1, len(packer), figsize=(5 * len(packer), 5))
-        for i in range(len(packer)):
-            for rect in all_rects:
-                b, x, y, w, h, rid = rect
-                if b == i:
-                    axs[i].add_patch(patches.Rectangle((x, y), w, h, facecolor='blue', edgecolor='black', alpha=0.5))
-            axs[i].set_title(f"Bin {i}")
-            axs[i].set_xlim(0, bin_size[0])
-            axs[i].set_ylim(0, bin_size[1])
-            axs[i].set_aspect('equal')
-
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+# 主程序
+if __name__ == "__main__":
+    # Needed by the PyInstaller exe so worker processes do not rerun the CLI
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,326 @@
+import bisect
+import math
+
+import numpy as np
+
+# Placement engines for one board. Each answers find_position(w, h) with the first free
+# anchor in x-then-y order (x outer, y inner, like the list-of-lists grids the scripts
+# used to scan) and records parts with mark_occupied.
+
+
+def grid_scale(sizes, bin_width, bin_height, allow_rotation=True):
+    # Largest cell size that keeps every coordinate exact. Anchors found by the packers
+    # are always sums of part sizes, so they stay on the coarse grid. With rotation a
+    # part's width can end up along y, so both axes share one GCD.
+    widths = [w for w, h in sizes]
+    heights = [h for w, h in sizes]
+    if allow_rotation:
+        scale = math.gcd(bin_width, bin_height, *widths, *heights)
+        return scale, scale
+    return math.gcd(bin_width, *widths), math.gcd(bin_height, *heights)
+
+
+class _CellGrid:
+    def __init__(self, width, height, scale=1):
+        self.width = width
+        self.height = height
+        # Board coordinates are divided by (scale_x, scale_y); one cell covers that many mm
+        self.scale_x, self.scale_y = (scale, scale) if isinstance(scale, int) else scale
+        self.cols = width // self.scale_x
+        self.rows = height // self.scale_y
+
+    def _to_cells(self, x, y, width, height):
+        # Round outwards so a size that is not a multiple of the scale still gets enough room
+        sx, sy = self.scale_x, self.scale_y
+        cx, cy = x // sx, y // sy
+        return cx, cy, -(-(x + width) // sx) - cx, -(-(y + height) // sy) - cy
+
+
+# Cells indexed [x][y] like the list-of-lists grids in the scripts. A summed-area table
+# answers "is this w x h rectangle free" in O(1) and lets us test every anchor position
+# for a part at once with array ops.
+class OccupancyGrid(_CellGrid):
+    def __init__(self, width, height, scale=1):
+        super().__init__(width, height, scale)
+        self.grid = np.zeros((self.cols, self.rows), dtype=bool)
+        # sat[i, j] = number of occupied cells in grid[:i, :j]
+        self.sat = np.zeros((self.cols + 1, self.rows + 1), dtype=np.int32)
+
+    def _rebuild(self):
+        self.sat[1:, 1:] = self.grid.cumsum(axis=0, dtype=np.int32).cumsum(axis=1, dtype=np.int32)
+
+    def _region_sum(self, x, y, width, height):
+        s = self.sat
+        return s[x + width, y + height] - s[x, y + height] - s[x + width, y] + s[x, y]
+
+    def is_occupied(self, x, y, width, height):
+        return self._region_sum(*self._to_cells(x, y, width, height)) > 0
+
+    def mark_occupied(self, x, y, width, height):
+        x, y, width, height = self._to_cells(x, y, width, height)
+        region = self.grid[x:x + width, y:y + height]
+        if region.any():
+            region[...] = True
+            self._rebuild()
+            return
+        region[...] = True
+        # Incremental update: every prefix [0, i) x [0, j) gains its overlap with the new part
+        dx = np.minimum(np.arange(1, self.cols - x + 1), width).astype(np.int32)
+        dy = np.minimum(np.arange(1, self.rows - y + 1), height).astype(np.int32)
+        self.sat[x + 1:, y + 1:] += dx[:, None] * dy[None, :]
+
+    def free_positions(self, width, height, x_start=0, x_stop=None):
+        # Boolean mask over anchor cells x in [x_start, x_stop), y in [0, rows - height];
+        # everything here is in cell units
+        x_limit = self.cols - width + 1
+        y_limit = self.rows - height + 1
+        if x_limit <= 0 or y_limit <= 0:
+            return np.zeros((0, 0), dtype=bool)
+        x_stop = x_limit if x_stop is None else min(x_stop, x_limit)
+        s = self.sat
+        xs = slice(x_start, x_stop)
+        xe = slice(x_start + width, x_stop + width)
+        counts = s[xe, height:] - s[xs, height:] - s[xe, :y_limit] + s[xs, :y_limit]
+        return counts == 0
+
+    def find_position(self, width, height, chunk=256):
+        # First free anchor in the scripts' scan order (x outer, y inner), or None
+        _, _, width, height = self._to_cells(0, 0, width, height)
+        x_limit = self.cols - width + 1
+        if height > self.rows:
+            return None
+        for x_start in range(0, max(x_limit, 0), chunk):
+            mask = self.free_positions(width, height, x_start, x_start + chunk)
+            if mask.any():
+                dx, y = np.unravel_index(np.argmax(mask), mask.shape)
+                return (x_start + int(dx)) * self.scale_x, int(y) * self.scale_y
+        return None
+
+
+def _first_run(free, length):
+    # Lowest bit index starting `length` consecutive set bits in the int `free`, or None
+    have = 1
+    while have < length and free:
+        step = min(have, length - have)
+        free &= free >> step
+        have += step
+    if not free:
+        return None
+    return (free & -free).bit_length() - 1
+
+
+# Full-resolution occupancy in about one bit per cell. Each column is a strip of 64-row
+# words (bit set = occupied). A binary tree over the columns caches, per node, the
+# longest and shortest free vertical run of any column below it. An anchor x needs a
+# free run of at least h in every one of its w columns, so subtrees whose longest run
+# is too short are skipped in one step, and a column whose run is too short rules out
+# every window containing it. Only windows that pass both tests get the exact check:
+# the packed columns are ORed into one occupied mask, and a run search with shifts
+# finds the lowest free gap in it.
+class BitmapGrid(_CellGrid):
+    def __init__(self, width, height, scale=1):
+        super().__init__(width, height, scale)
+        self.words = -(-self.rows // 64)
+        self.bits = np.zeros((self.cols, self.words), dtype='<u8')
+        # Rows beyond the board are marked occupied so runs never leave the board
+        self.bits[:, :] = self._row_mask(self.rows, self.words * 64 - self.rows)
+        self.size = 1
+        while self.size < self.cols:
+            self.size *= 2
+        self.max_run = np.full(2 * self.size, -1, dtype=np.int64)
+        self.min_run = np.full(2 * self.size, -1, dtype=np.int64)
+        self.max_run[self.size:self.size + self.cols] = self.rows
+        self.min_run[self.size:self.size + self.cols] = self.rows
+        for node in range(self.size - 1, 0, -1):
+            self.max_run[node] = max(self.max_run[2 * node], self.max_run[2 * node + 1])
+            self.min_run[node] = min(self.min_run[2 * node], self.min_run[2 * node + 1])
+
+    def _row_mask(self, y, height):
+        mask = np.zeros(self.words * 64, dtype=bool)
+        mask[y:y + height] = True
+        return np.packbits(mask, bitorder='little').view('<u8')
+
+    def _column_runs(self, x, width):
+        # Longest free run in each column of [x, x + width), one vectorised pass
+        free = ~np.unpackbits(self.bits[x:x + width].view(np.uint8), axis=1, bitorder='little').astype(bool)
+        padded = np.zeros((width, free.shape[1] + 2), dtype=np.int8)
+        padded[:, 1:-1] = free
+        edges = np.diff(padded.ravel())
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        runs = np.zeros(width, dtype=np.int64)
+        np.maximum.at(runs, starts // padded.shape[1], ends - starts)
+        return runs
+
+    def _update_tree(self, x, width):
+        self.max_run[self.size + x:self.size + x + width] = self._column_runs(x, width)
+        self.min_run[self.size + x:self.size + x + width] = self.max_run[self.size + x:self.size + x + width]
+        lo, hi = (self.size + x) // 2, (self.size + x + width - 1) // 2
+        while lo >= 1:
+            for node in range(lo, hi + 1):
+                self.max_run[node] = max(self.max_run[2 * node], self.max_run[2 * node + 1])
+                self.min_run[node] = min(self.min_run[2 * node], self.min_run[2 * node + 1])
+            lo, hi = lo // 2, hi // 2
+
+    def _first_fitting_column(self, node, lo, hi, x, height):
+        # First column >= x whose longest free run is at least `height`
+        if hi <= x or self.max_run[node] < height:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        found = self._first_fitting_column(2 * node, lo, mid, x, height)
+        if found is None:
+            found = self._first_fitting_column(2 * node + 1, mid, hi, x, height)
+        return found
+
+    def _first_short_column(self, node, lo, hi, x, end, height):
+        # First column in [x, end) whose longest free run is shorter than `height`
+        if hi <= x or lo >= end or self.min_run[node] >= height:
+            return None
+        if hi - lo == 1:
+            return lo
+        mid = (lo + hi) // 2
+        found = self._first_short_column(2 * node, lo, mid, x, end, height)
+        if found is None:
+            found = self._first_short_column(2 * node + 1, mid, hi, x, end, height)
+        return found
+
+    def is_occupied(self, x, y, width, height):
+        x, y, width, height = self._to_cells(x, y, width, height)
+        return bool((self.bits[x:x + width] & self._row_mask(y, height)).any())
+
+    def mark_occupied(self, x, y, width, height):
+        x, y, width, height = self._to_cells(x, y, width, height)
+        self.bits[x:x + width] |= self._row_mask(y, height)
+        self._update_tree(x, width)
+
+    def find_position(self, width, height):
+        # First free anchor in x-then-y order, or None
+        _, _, width, height = self._to_cells(0, 0, width, height)
+        if width > self.cols or height > self.rows:
+            return None
+        x = 0
+        while True:
+            x = self._first_fitting_column(1, 0, self.size, x, height)
+            if x is None or x + width > self.cols:
+                return None
+            short = self._first_short_column(1, 0, self.size, x, x + width, height)
+            if short is not None:
+                x = short + 1
+                continue
+            occupied = np.bitwise_or.reduce(self.bits[x:x + width], axis=0)
+            free = ~int.from_bytes(occupied.tobytes(), 'little') & ((1 << (self.words * 64)) - 1)
+            y = _first_run(free, height)
+            if y is not None:
+                return x * self.scale_x, y * self.scale_y
+            x += 1
+
+
+# Same interface as OccupancyGrid and BitmapGrid, but without a grid. The first free anchor in x-then-y
+# order always has its left edge on 0 or on a placed part's right edge, and its bottom
+# edge on 0 or on a placed part's top edge, so only those corner points are tried.
+# Memory and query cost depend on the number of placed parts, not on the board area.
+class CornerPointGrid:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.placed = []  # (bottom, top, left, right), kept sorted by bottom edge
+        self.xs = [0]     # candidate left edges, sorted
+
+    def is_occupied(self, x, y, width, height):
+        return any(left < x + width and x < right and bottom < y + height and y < top
+                   for bottom, top, left, right in self.placed)
+
+    def mark_occupied(self, x, y, width, height):
+        bisect.insort(self.placed, (y, y + height, x, x + width))
+        i = bisect.bisect_left(self.xs, x + width)
+        if i == len(self.xs) or self.xs[i] != x + width:
+            self.xs.insert(i, x + width)
+
+    def _lowest_y(self, x, width, height):
+        # Sweep the parts crossing the column [x, x + width) from the bottom up and
+        # return the first gap that is tall enough
+        y = 0
+        for bottom, top, left, right in self.placed:
+            if left >= x + width or right <= x:
+                continue
+            if bottom >= y + height:
+                break
+            y = max(y, top)
+        return y if y + height <= self.height else None
+
+    def find_position(self, width, height):
+        for x in self.xs:
+            if x + width > self.width:
+                break
+            y = self._lowest_y(x, width, height)
+            if y is not None:
+                return x, y
+        return None
+
+
+# Footprints that already found no room on the current board. A board only fills up, so
+# a footprint at least as wide and as tall as a failed one cannot fit either and needs
+# no scan. Start a new cache for every board.
+class FailedSizeCache:
+    def __init__(self):
+        self.failed = []  # minimal failed (width, height) pairs
+
+    def dominated(self, width, height):
+        return any(width >= w and height >= h for w, h in self.failed)
+
+    def add(self, width, height):
+        if self.dominated(width, height):
+            return
+        self.failed = [(w, h) for w, h in self.failed if not (w >= width and h >= height)]
+        self.failed.append((width, height))
+
+
+# Placed rectangles bucketed by a uniform grid of cell x cell squares, so an overlap test
+# only looks at the parts in the buckets it touches. with_added/with_removed return a new
+# index that shares every untouched bucket with this one; nothing is ever changed in
+# place, so a caller can keep the old index as long as it likes.
+class SpatialHash:
+    def __init__(self, cell, rects=None, buckets=None):
+        self.cell = cell
+        self.rects = rects if rects is not None else {}      # key -> (x, y, width, height)
+        self.buckets = buckets if buckets is not None else {}  # (i, j) -> tuple of keys
+
+    def _cells(self, x, y, width, height):
+        c = self.cell
+        i0, j0 = int(x // c), int(y // c)
+        i1, j1 = max(i0 + 1, math.ceil((x + width) / c)), max(j0 + 1, math.ceil((y + height) / c))
+        return [(i, j) for i in range(i0, i1) for j in range(j0, j1)]
+
+    def overlaps(self, x, y, width, height, ignore=None):
+        seen = set()
+        for cell in self._cells(x, y, width, height):
+            for key in self.buckets.get(cell, ()):
+                if key == ignore or key in seen:
+                    continue
+                seen.add(key)
+                rx, ry, rw, rh = self.rects[key]
+                if rx < x + width and x < rx + rw and ry < y + height and y < ry + rh:
+                    return True
+        return False
+
+    def with_added(self, key, x, y, width, height):
+        rects = dict(self.rects)
+        rects[key] = (x, y, width, height)
+        buckets = dict(self.buckets)
+        for cell in self._cells(x, y, width, height):
+            buckets[cell] = buckets.get(cell, ()) + (key,)
+        return SpatialHash(self.cell, rects, buckets)
+
+    def with_removed(self, key):
+        rects = dict(self.rects)
+        x, y, width, height = rects.pop(key)
+        buckets = dict(self.buckets)
+        for cell in self._cells(x, y, width, height):
+            keys = tuple(k for k in buckets[cell] if k != key)
+            if keys:
+                buckets[cell] = keys
+            else:
+                del buckets[cell]
+        return SpatialHash(self.cell, rects, buckets)
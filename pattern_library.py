@@ -0,0 +1,101 @@
+import json
+import time
+
+import plate_storage
+
+# Library of well-filled sheet layouts shared between jobs. A pattern is indexed by its
+# demand vector, the count of pieces per part size. Sizes are stored as (short side,
+# long side) so a part entered as 200x100 in one project matches 100x200 in another.
+# Before a job is packed, every pattern whose demand fits in the open order can be cut
+# as is, and only the remainder goes to the packer.
+
+
+def _size(width, height):
+    return (min(width, height), max(width, height))
+
+
+class PatternLibrary:
+    def __init__(self, db_file, min_utilization=0.85):
+        self.min_utilization = min_utilization
+        self.conn = plate_storage.connect(db_file)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS Sheet_pattern
+                             (Pattern_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                             Sheet_Width REAL,
+                             Sheet_Height REAL,
+                             Demand TEXT,
+                             Layout TEXT,
+                             Utilization REAL,
+                             Uses INTEGER DEFAULT 0,
+                             Last_Used REAL,
+                             UNIQUE (Sheet_Width, Sheet_Height, Demand))''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_pattern_sheet ON Sheet_pattern "
+                          "(Sheet_Width, Sheet_Height, Utilization)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_layouts(self, packer, rectangles, bin_size):
+        # Store every sheet of a packing result that reaches min_utilization; returns
+        # how many new patterns were added
+        sizes = {r[3]: _size(r[0], r[1]) for r in rectangles}
+        bins = [[] for _ in range(len(packer))]
+        for b, x, y, w, h, rid in packer.rect_list():
+            bins[b].append((x, y, w, h, sizes[rid]))
+
+        rows = []
+        bin_area = bin_size[0] * bin_size[1]
+        for sheet in bins:
+            utilization = sum(w * h for x, y, w, h, size in sheet) / bin_area
+            if not sheet or utilization < self.min_utilization:
+                continue
+            counts = {}
+            for *_, size in sheet:
+                counts[size] = counts.get(size, 0) + 1
+            demand = sorted(counts.items())
+            index = {size: g for g, (size, _) in enumerate(demand)}
+            layout = [(x, y, w, h, index[size]) for x, y, w, h, size in sheet]
+            rows.append((bin_size[0], bin_size[1], json.dumps([[*size, n] for size, n in demand]),
+                         json.dumps(layout), utilization))
+
+        with self.conn:
+            before = self.conn.total_changes
+            self.conn.executemany("INSERT OR IGNORE INTO Sheet_pattern (Sheet_Width, Sheet_Height, Demand, Layout, "
+                                  "Utilization) VALUES (?, ?, ?, ?, ?)", rows)
+            return self.conn.total_changes - before
+
+    def match(self, rectangles, bin_size):
+        # Cut as many library sheets as the order allows, best utilization first.
+        # Returns (sheets, remainder): sheets are lists of (x, y, w, h, id) and the
+        # remainder is the rectangles no pattern took.
+        available = {}
+        for r in rectangles:
+            available.setdefault(_size(r[0], r[1]), []).append(r)
+
+        rows = self.conn.execute("SELECT Pattern_ID, Demand, Layout FROM Sheet_pattern "
+                                 "WHERE Sheet_Width = ? AND Sheet_Height = ? ORDER BY Utilization DESC",
+                                 tuple(bin_size)).fetchall()
+        sheets = []
+        used = []
+        for pattern_id, demand_json, layout_json in rows:
+            demand = [((w, h), n) for w, h, n in json.loads(demand_json)]
+            if any(len(available.get(size, ())) < n for size, n in demand):
+                continue
+            multiplicity = min(len(available[size]) // n for size, n in demand)
+            layout = json.loads(layout_json)
+            for _ in range(multiplicity):
+                sheets.append([(x, y, w, h, available[demand[g][0]].pop()[3]) for x, y, w, h, g in layout])
+            used.append((multiplicity, time.time(), pattern_id))
+
+        if used:
+            with self.conn:
+                self.conn.executemany("UPDATE Sheet_pattern SET Uses = Uses + ?, Last_Used = ? WHERE Pattern_ID = ?",
+                                      used)
+        remaining_ids = {r[3] for group in available.values() for r in group}
+        return sheets, [r for r in rectangles if r[3] in remaining_ids]
@@ -0,0 +1,231 @@
+import pathlib
+import queue
+import sqlite3
+from contextlib import contextmanager
+
+# SQLite access for the nesting input (Plate_table_one) and results. The results database
+# runs in WAL mode, so a nesting run can write while CNC-preparation tools read; readers
+# see the last committed job and never block the writer or each other.
+
+
+def connect(db_file, readonly=False, timeout=30):
+    if readonly:
+        uri = pathlib.Path(db_file).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=timeout, check_same_thread=False)
+    else:
+        conn = sqlite3.connect(db_file, timeout=timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(timeout * 1000)}")
+    return conn
+
+
+def create_output_schema(conn):
+    c = conn.cursor()
+    c.execute('''CREATE TABLE IF NOT EXISTS Plate_table_output
+                 (Bin_ID INTEGER,
+                 Utilization REAL,
+                 Type INTEGER,
+                 Width REAL,
+                 Height REAL,
+                 Is_Rotated INTEGER,
+                 Bottom_Left_X REAL,
+                 Bottom_Left_Y REAL)''')
+
+    # One row per nesting run, and one row per placed piece keyed by run, bin and part ID
+    c.execute('''CREATE TABLE IF NOT EXISTS Packing_job
+                 (Job_ID INTEGER PRIMARY KEY AUTOINCREMENT,
+                 Created_At TEXT DEFAULT CURRENT_TIMESTAMP,
+                 Bin_Width REAL,
+                 Bin_Height REAL,
+                 Bin_Count INTEGER,
+                 Part_Count INTEGER)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS Packing_placement
+                 (Job_ID INTEGER REFERENCES Packing_job(Job_ID),
+                 Bin_ID INTEGER,
+                 Part_ID TEXT,
+                 Type INTEGER,
+                 Width REAL,
+                 Height REAL,
+                 Is_Rotated INTEGER,
+                 Bottom_Left_X REAL,
+                 Bottom_Left_Y REAL)''')
+    c.execute("CREATE INDEX IF NOT EXISTS idx_placement_job_bin ON Packing_placement (Job_ID, Bin_ID)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_placement_job_part ON Packing_placement (Job_ID, Part_ID)")
+    # Sheets handed to the cutter; an incremental run must leave them as they are
+    c.execute('''CREATE TABLE IF NOT EXISTS Released_bin
+                 (Job_ID INTEGER REFERENCES Packing_job(Job_ID),
+                 Bin_ID INTEGER,
+                 Released_At TEXT DEFAULT CURRENT_TIMESTAMP,
+                 PRIMARY KEY (Job_ID, Bin_ID))''')
+    conn.commit()
+
+
+def read_part_rows(db_file):
+    conn = connect(db_file, readonly=True)
+    try:
+        return conn.execute("SELECT Size_type, Count, Width, Height, ID_list FROM Plate_table_one").fetchall()
+    finally:
+        conn.close()
+
+
+def write_job(db_file, bin_size, bin_count, output_rows, placement_rows, released_bins=()):
+    # output_rows match Plate_table_output; placement_rows match Packing_placement
+    # without the leading Job_ID; released_bins are carried over from the job this one
+    # extends. Everything is committed in one transaction.
+    conn = connect(db_file)
+    try:
+        create_output_schema(conn)
+        with conn:
+            c = conn.cursor()
+            c.execute("INSERT INTO Packing_job (Bin_Width, Bin_Height, Bin_Count, Part_Count) VALUES (?, ?, ?, ?)",
+                      (bin_size[0], bin_size[1], bin_count, len(placement_rows)))
+            job_id = c.lastrowid
+            c.executemany("INSERT INTO Plate_table_output VALUES (?, ?, ?, ?, ?, ?, ?, ?)", output_rows)
+            c.executemany("INSERT INTO Packing_placement VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          [(job_id,) + tuple(row) for row in placement_rows])
+            c.executemany("INSERT INTO Released_bin (Job_ID, Bin_ID) VALUES (?, ?)",
+                          [(job_id, bin_id) for bin_id in released_bins])
+    finally:
+        conn.close()
+    return job_id
+
+
+class JobWriter:
+    # A job written one bin at a time, for streaming packing. Each add_bin is its own
+    # transaction, so readers see a sheet as soon as it is closed.
+    def __init__(self, db_file, bin_size):
+        self.conn = connect(db_file)
+        create_output_schema(self.conn)
+        with self.conn:
+            c = self.conn.execute("INSERT INTO Packing_job (Bin_Width, Bin_Height, Bin_Count, Part_Count) "
+                                  "VALUES (?, ?, 0, 0)", (bin_size[0], bin_size[1]))
+        self.job_id = c.lastrowid
+
+    def add_bin(self, output_rows, placement_rows):
+        with self.conn:
+            c = self.conn.cursor()
+            c.executemany("INSERT INTO Plate_table_output VALUES (?, ?, ?, ?, ?, ?, ?, ?)", output_rows)
+            c.executemany("INSERT INTO Packing_placement VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                          [(self.job_id,) + tuple(row) for row in placement_rows])
+            c.execute("UPDATE Packing_job SET Bin_Count = Bin_Count + 1, Part_Count = Part_Count + ? "
+                      "WHERE Job_ID = ?", (len(placement_rows), self.job_id))
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def release_bins(db_file, job_id, bin_ids):
+    # job_id None means the latest job; returns the job the bins were released from.
+    # Raises ValueError when there is no such job or a bin is not one of its sheets. The
+    # request is checked on a read-only connection, so a bad one never creates or changes
+    # the database.
+    if not pathlib.Path(db_file).is_file():
+        raise ValueError(f"No results database {db_file}")
+    conn = connect(db_file, readonly=True)
+    try:
+        row = None
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Packing_job'").fetchone():
+            if job_id is None:
+                job_id = conn.execute("SELECT MAX(Job_ID) FROM Packing_job").fetchone()[0]
+            row = conn.execute("SELECT Bin_Count FROM Packing_job WHERE Job_ID = ?", (job_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        raise ValueError(f"No packing job {job_id} found in {db_file}" if job_id is not None
+                         else f"No packing job found in {db_file}")
+    invalid = [bin_id for bin_id in bin_ids if not 0 <= bin_id < row[0]]
+    if invalid:
+        raise ValueError(f"Job {job_id} has bins 0 to {row[0] - 1}, not {invalid}")
+
+    conn = connect(db_file)
+    try:
+        create_output_schema(conn)  # results databases from before Released_bin lack the table
+        with conn:
+            conn.executemany("INSERT OR IGNORE INTO Released_bin (Job_ID, Bin_ID) VALUES (?, ?)",
+                             [(job_id, bin_id) for bin_id in bin_ids])
+    finally:
+        conn.close()
+    return job_id
+
+
+class ReadPool:
+    # A fixed set of read-only connections shared by consumer threads
+    def __init__(self, db_file, size=4):
+        self._connections = queue.Queue()
+        for _ in range(size):
+            self._connections.put(connect(db_file, readonly=True))
+
+    @contextmanager
+    def connection(self):
+        conn = self._connections.get()
+        try:
+            yield conn
+        finally:
+            self._connections.put(conn)
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+class ResultsReader:
+    PLACEMENT_COLUMNS = "Job_ID, Bin_ID, Part_ID, Type, Width, Height, Is_Rotated, Bottom_Left_X, Bottom_Left_Y"
+
+    def __init__(self, db_file, pool_size=4):
+        self.pool = ReadPool(db_file, pool_size)
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _query(self, sql, params=()):
+        with self.pool.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _job(self, job_id):
+        return self.latest_job() if job_id is None else job_id
+
+    def jobs(self):
+        return self._query("SELECT Job_ID, Created_At, Bin_Width, Bin_Height, Bin_Count, Part_Count "
+                           "FROM Packing_job ORDER BY Job_ID")
+
+    def latest_job(self):
+        rows = self._query("SELECT MAX(Job_ID) FROM Packing_job")
+        return rows[0][0] if rows else None
+
+    def job(self, job_id=None):
+        rows = self._query("SELECT Job_ID, Created_At, Bin_Width, Bin_Height, Bin_Count, Part_Count "
+                           "FROM Packing_job WHERE Job_ID = ?", (self._job(job_id),))
+        return rows[0] if rows else None
+
+    def placements(self, job_id=None):
+        return self._query(f"SELECT {self.PLACEMENT_COLUMNS} FROM Packing_placement WHERE Job_ID = ? "
+                           "ORDER BY Bin_ID", (self._job(job_id),))
+
+    def released_bins(self, job_id=None):
+        # Results databases written before bins could be released have no such table
+        if not self._query("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'Released_bin'"):
+            return []
+        rows = self._query("SELECT Bin_ID FROM Released_bin WHERE Job_ID = ? ORDER BY Bin_ID", (self._job(job_id),))
+        return [row[0] for row in rows]
+
+    def placements_for_bin(self, bin_id, job_id=None):
+        return self._query(f"SELECT {self.PLACEMENT_COLUMNS} FROM Packing_placement "
+                           "WHERE Job_ID = ? AND Bin_ID = ?", (self._job(job_id), bin_id))
+
+    def bins_containing_part(self, part_id, job_id=None):
+        rows = self._query("SELECT DISTINCT Bin_ID FROM Packing_placement WHERE Job_ID = ? AND Part_ID = ? "
+                           "ORDER BY Bin_ID", (self._job(job_id), str(part_id)))
+        return [row[0] for row in rows]
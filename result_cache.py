@@ -0,0 +1,104 @@
+import hashlib
+import json
+import time
+import zlib
+
+import plate_storage
+
+# Persistent cache of nesting results. The key is a hash of everything that decides the
+# layout: the multiset of part sizes and types, the sheet size, rotation, the algorithm and
+# its parameters. Piece IDs are not part of the key; placements are stored as
+# (group, position in group), so a re-export with renumbered pieces still hits and gets
+# its own IDs back in the same slots.
+
+KEY_VERSION = 1  # bump when a packing algorithm changes its output
+
+
+def part_groups(rectangles):
+    # Canonical order of the (width, height, type_id) groups and each group's piece IDs
+    groups = {}
+    for width, height, type_id, id in rectangles:
+        groups.setdefault((width, height, type_id), []).append(id)
+    keys = sorted(groups, key=lambda k: (k[0], k[1], str(k[2])))
+    return [(key, groups[key]) for key in keys]
+
+
+def job_key(rectangles, bin_size, algorithm, params=None, rotation=True):
+    spec = {
+        'version': KEY_VERSION,
+        'parts': [[w, h, type_id, len(ids)] for (w, h, type_id), ids in part_groups(rectangles)],
+        'sheet': list(bin_size),
+        'rotation': rotation,
+        'algorithm': algorithm,
+        'params': params or {},
+    }
+    return hashlib.sha256(json.dumps(spec, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+
+
+class ResultCache:
+    def __init__(self, db_file, max_entries=1000, max_bytes=256 * 2 ** 20):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.conn = plate_storage.connect(db_file)
+        self.conn.execute('''CREATE TABLE IF NOT EXISTS Result_cache
+                             (Cache_Key TEXT PRIMARY KEY,
+                             Created_At REAL,
+                             Last_Used REAL,
+                             Size_Bytes INTEGER,
+                             Payload BLOB)''')
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON Result_cache (Last_Used)")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def get(self, key, rectangles):
+        # (rects, bin_count, unpacked, oversized, config) with this job's piece IDs, or None
+        row = self.conn.execute("SELECT Payload FROM Result_cache WHERE Cache_Key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE Result_cache SET Last_Used = ? WHERE Cache_Key = ?", (time.time(), key))
+        payload = json.loads(zlib.decompress(row[0]))
+        ids = [group_ids for _, group_ids in part_groups(rectangles)]
+        rects = [(b, x, y, w, h, ids[g][k]) for b, x, y, w, h, g, k in payload['rects']]
+        unpacked = [ids[g][k] for g, k in payload['unpacked']]
+        oversized = [ids[g][k] for g, k in payload['oversized']]
+        config = tuple(payload['config']) if payload['config'] else None
+        return rects, payload['bin_count'], unpacked, oversized, config
+
+    def put(self, key, rectangles, result):
+        slot = {}
+        for g, (_, group_ids) in enumerate(part_groups(rectangles)):
+            for k, id in enumerate(group_ids):
+                slot[id] = (g, k)
+        payload = {
+            'rects': [(b, x, y, w, h) + slot[rid] for b, x, y, w, h, rid in result.rect_list()],
+            'bin_count': len(result),
+            'unpacked': [slot[rid] for rid in result.unpacked],
+            'oversized': [slot[rid] for rid in result.oversized],
+            'config': getattr(result, 'config', None),
+        }
+        blob = zlib.compress(json.dumps(payload, separators=(',', ':')).encode())
+        now = time.time()
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO Result_cache VALUES (?, ?, ?, ?, ?)",
+                              (key, now, now, len(blob), blob))
+            self._evict()
+
+    def _evict(self):
+        # Keep the most recently used entries within both the entry and the size limit
+        rows = self.conn.execute("SELECT Cache_Key, Size_Bytes FROM Result_cache ORDER BY Last_Used DESC").fetchall()
+        total = 0
+        stale = []
+        for n, (key, size) in enumerate(rows):
+            total += size
+            if n >= self.max_entries or total > self.max_bytes:
+                stale.append((key,))
+        self.conn.executemany("DELETE FROM Result_cache WHERE Cache_Key = ?", stale)
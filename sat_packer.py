@@ -0,0 +1,181 @@
+from ortools.sat.python import cp_model
+
+# Exact single-sheet packer on CP-SAT, shared by the single_plate scripts. Each part
+# instance is optional: a placed literal split into an upright and a turned literal, each
+# enabling its own pair of fixed-size intervals on shared x/y starts. One AddNoOverlap2D
+# covers every box, so the model grows linearly with the parts; identical instances are
+# kept in (x, y) order to break symmetry, and the objective is the placed area.
+
+
+class Rectangle:
+    def __init__(self, id, width, height, max_count):
+        self.id = id
+        self.width = width
+        self.height = height
+        self.max_count = max_count
+        self.placements = []  # (x, y, placed width, placed height)
+
+
+class SolutionSink(cp_model.CpSolverSolutionCallback):
+    # Hands every improving solution to sink(layout, area, bound, seconds), where layout
+    # is a list of (rect, instance, x, y, w, h). Stops the search once the placed area is
+    # within stop_gap of the proven bound.
+    def __init__(self, packer, sink=None, stop_gap=0.0):
+        super().__init__()
+        self.packer = packer
+        self.sink = sink
+        self.stop_gap = stop_gap
+
+    def on_solution_callback(self):
+        area = self.ObjectiveValue()
+        bound = min(self.BestObjectiveBound(), self.packer.area_bound)
+        if self.sink is not None:
+            self.sink(self.packer.layout(self.Value), area, bound, self.WallTime())
+        if bound - area <= self.stop_gap * bound:
+            self.StopSearch()
+
+
+def print_progress(layout, area, bound, seconds):
+    # A sink that prints one line per improving solution
+    print(f"{seconds:7.2f}s  {len(layout)} parts placed, area {area:.0f} (bound {bound:.0f})")
+
+
+class ORToolsRectanglePacker:
+    def __init__(self, bin_width, bin_height, rectangles, allow_rotation=True):
+        self.bin_width = bin_width
+        self.bin_height = bin_height
+        self.rectangles = rectangles
+        self.allow_rotation = allow_rotation
+        self.model = cp_model.CpModel()
+        self.solver = cp_model.CpSolver()
+        self.variables = []  # (rect, instance, placed, upright, turned, x, y)
+        self.area_bound = 0  # placed area can be no more than the demand or the sheet
+        self.optimization_steps = []  # To store detailed procedure information
+
+    def _orientation(self, name, x, y, w, h, x_boxes, y_boxes):
+        # Literal for one orientation; fixed to false when the part does not fit that way
+        lit = self.model.NewBoolVar(name)
+        if w > self.bin_width or h > self.bin_height:
+            self.model.Add(lit == 0)
+            return lit
+        self.model.Add(x + w <= self.bin_width).OnlyEnforceIf(lit)
+        self.model.Add(y + h <= self.bin_height).OnlyEnforceIf(lit)
+        x_boxes.append(self.model.NewOptionalFixedSizeIntervalVar(x, w, lit, f'{name}_xi'))
+        y_boxes.append(self.model.NewOptionalFixedSizeIntervalVar(y, h, lit, f'{name}_yi'))
+        return lit
+
+    def build_model(self):
+        x_boxes, y_boxes = [], []
+        area = []
+        for rect in self.rectangles:
+            previous = None
+            for i in range(rect.max_count):
+                name = f'{rect.id}_{i}'
+                x = self.model.NewIntVar(0, self.bin_width, f'x_{name}')
+                y = self.model.NewIntVar(0, self.bin_height, f'y_{name}')
+                placed = self.model.NewBoolVar(f'placed_{name}')
+                upright = self._orientation(f'upright_{name}', x, y, rect.width, rect.height, x_boxes, y_boxes)
+                if self.allow_rotation and rect.width != rect.height:
+                    turned = self._orientation(f'turned_{name}', x, y, rect.height, rect.width, x_boxes, y_boxes)
+                else:
+                    turned = self.model.NewConstant(0)
+                self.model.Add(upright + turned == placed)
+                # An instance left out sits at the origin
+                self.model.Add(x == 0).OnlyEnforceIf(placed.Not())
+                self.model.Add(y == 0).OnlyEnforceIf(placed.Not())
+
+                # Identical instances are interchangeable: place them in order and keep
+                # their bottom-left corners in increasing (x, y) order
+                if previous is not None:
+                    prev_placed, prev_x, prev_y = previous
+                    self.model.AddImplication(placed, prev_placed)
+                    self.model.Add(prev_x * (self.bin_height + 1) + prev_y < x * (self.bin_height + 1) + y
+                                   ).OnlyEnforceIf(placed)
+                previous = (placed, x, y)
+
+                area.append(rect.width * rect.height * placed)
+                self.variables.append((rect, i, placed, upright, turned, x, y))
+
+        self.model.AddNoOverlap2D(x_boxes, y_boxes)
+        self.model.Maximize(sum(area))
+        self.area_bound = min(sum(r.width * r.height * r.max_count for r in self.rectangles),
+                              self.bin_width * self.bin_height)
+
+    def greedy_layout(self):
+        # Fast MaxRects layout of as many instances as fit: {(rect id, instance): (x, y, w, h)}
+        import rectpack
+
+        packer = rectpack.newPacker(pack_algo=rectpack.MaxRectsBssf, rotation=self.allow_rotation)
+        packer.add_bin(self.bin_width, self.bin_height)
+        for rect in self.rectangles:
+            for i in range(rect.max_count):
+                packer.add_rect(rect.width, rect.height, (rect.id, i))
+        packer.pack()
+        return {rid: (x, y, w, h) for _, x, y, w, h, rid in packer.rect_list()}
+
+    def add_greedy_hint(self):
+        # The hint has to respect the symmetry breaking: each type's greedy pieces go to
+        # its first instances in (x, y) order
+        greedy = self.greedy_layout()
+        boxes = {}
+        for (rect_id, _), box in greedy.items():
+            boxes.setdefault(rect_id, []).append(box)
+        for rect_id in boxes:
+            boxes[rect_id].sort()
+        for rect, i, placed, upright, turned, x, y in self.variables:
+            rect_boxes = boxes.get(rect.id, [])
+            if i < len(rect_boxes):
+                bx, by, w, h = rect_boxes[i]
+                rotated = (w, h) != (rect.width, rect.height)
+            else:
+                bx = by = 0
+                rotated = None
+            self.model.AddHint(placed, rotated is not None)
+            self.model.AddHint(upright, rotated is False)
+            if self.allow_rotation and rect.width != rect.height:
+                self.model.AddHint(turned, rotated is True)
+            self.model.AddHint(x, bx)
+            self.model.AddHint(y, by)
+        return len(greedy)
+
+    def layout(self, value):
+        # Placed instances as (rect, instance, x, y, w, h) under a solver or callback value function
+        placed_boxes = []
+        for rect, i, placed, upright, turned, x, y in self.variables:
+            if not value(placed):
+                continue
+            w, h = (rect.height, rect.width) if value(turned) else (rect.width, rect.height)
+            placed_boxes.append((rect, i, value(x), value(y), w, h))
+        return placed_boxes
+
+    def pack(self, time_limit=120, num_search_workers=None, sink=None, hint=True, stop_gap=0.0):
+        # sink, if given, receives every improving layout as it is found (see SolutionSink)
+        self.build_model()
+        if hint:
+            self.add_greedy_hint()
+        # Set a time limit for the solver
+        self.solver.parameters.max_time_in_seconds = time_limit
+        if num_search_workers is not None:
+            self.solver.parameters.num_search_workers = num_search_workers
+
+        # Solve the model
+        status = self.solver.Solve(self.model, SolutionSink(self, sink, stop_gap))
+
+        if status == cp_model.FEASIBLE:
+            print("Feasible solution found.")
+        elif status == cp_model.OPTIMAL:
+            print("Optimal solution found.")
+        else:
+            print("No solution found within the time limit.")
+
+        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            for rect, i, x, y, w, h in self.layout(self.solver.Value):
+                rect.placements.append((x, y, w, h))
+                self.optimization_steps.append(f"Rectangle {rect.id} Instance {i}: Placed at ({x}, {y})"
+                                               + (" rotated" if (w, h) != (rect.width, rect.height) else ""))
+        return status  # Return the solving status
+
+    def log_optimization_steps(self):
+        # Log the detailed procedure information
+        for step in self.optimization_steps:
+            print(step)
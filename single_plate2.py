@@ -1,9 +1,10 @@
 from ortools.sat.python import cp_model
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from sat_packer import ORToolsRectanglePacker, Rectangle, print_progress
 
-#use or-tools, 但是 规模到1000+依然会有问题
-#只能处理垂直拍不的情况，不能适应横着摆放的情况
+#use or-tools (模型在 sat_packer.py): 每个零件两对可选区间 (正放/旋转) + AddNoOverlap2D, 模型规模与零件数成线性
+#同类零件按 (x, y) 字典序排列, 去掉对称解
 
 def plot_layout(rectangles, bin_width, bin_height, title='Final Layout', save_path='final_layout.jpg'):
     fig, ax = plt.subplots(figsize=(10, 8))  # Adjusted for additional text space
@@ -14,11 +15,11 @@ def plot_layout(rectangles, bin_width, bin_height, title='Final Layout', save_pa
     ax.add_patch(patches.Rectangle((0, 0), bin_width, bin_height, edgecolor='r', facecolor='none'))
 
     for rect in rectangles:
-        for x, y in rect.placements:
+        for x, y, w, h in rect.placements:
             ax.add_patch(
-                patches.Rectangle((x, y), rect.width, rect.height, edgecolor='black', facecolor='skyblue', alpha=0.6))
-            plt.text(x + rect.width / 2, y + rect.height / 2, str(rect.id), ha="center", va="center", color='black')
-            occupied_area += rect.width * rect.height
+                patches.Rectangle((x, y), w, h, edgecolor='black', facecolor='skyblue', alpha=0.6))
+            plt.text(x + w / 2, y + h / 2, str(rect.id), ha="center", va="center", color='black')
+            occupied_area += w * h
             board_types.add(rect.id)
 
     vacant_area = bin_area - occupied_area
@@ -44,85 +45,6 @@ def plot_layout(rectangles, bin_width, bin_height, title='Final Layout', save_pa
     plt.close(fig)
 
 
-class Rectangle:
-    def __init__(self, id, width, height, max_count):
-        self.id = id
-        self.width = width
-        self.height = height
-        self.max_count = max_count
-        self.placements = []
-
-class ORToolsRectanglePacker:
-    def __init__(self, bin_width, bin_height, rectangles):
-        self.bin_width = bin_width
-        self.bin_height = bin_height
-        self.rectangles = rectangles
-        self.model = cp_model.CpModel()
-        self.solver = cp_model.CpSolver()
-        self.variables = []
-        self.optimization_steps = []  # To store detailed procedure information
-
-    def pack(self):
-        for rect in self.rectangles:
-            for i in range(rect.max_count):
-                # Decision variables for position
-                x_var = self.model.NewIntVar(0, self.bin_width, f'x_{rect.id}_{i}')
-                y_var = self.model.NewIntVar(0, self.bin_height, f'y_{rect.id}_{i}')
-                # Decision variable for rotation (0: no rotation, 1: rotated 90 degrees)
-                rot_var = self.model.NewBoolVar(f'rot_{rect.id}_{i}')
-                # Adjust width and height based on rotation
-                width = rect.width if rot_var == 0 else rect.height
-                height = rect.height if rot_var == 0 else rect.width
-                # Ensure the rectangle fits within the bin dimensions, considering rotation
-                self.model.Add(x_var + width <= self.bin_width)
-                self.model.Add(y_var + height <= self.bin_height)
-                self.variables.append((rect, x_var, y_var, rot_var))
-
-        # Constraint to prevent overlap
-        for i in range(len(self.variables)):
-            for j in range(i + 1, len(self.variables)):
-                rect1, x1, y1, _ = self.variables[i]
-                rect2, x2, y2, _ = self.variables[j]
-
-                left = self.model.NewBoolVar(f'left_{i}_{j}')
-                right = self.model.NewBoolVar(f'right_{i}_{j}')
-                above = self.model.NewBoolVar(f'above_{i}_{j}')
-                below = self.model.NewBoolVar(f'below_{i}_{j}')
-
-                self.model.Add(x1 + rect1.width <= x2).OnlyEnforceIf(left)
-                self.model.Add(x2 + rect2.width <= x1).OnlyEnforceIf(right)
-                self.model.Add(y1 + rect1.height <= y2).OnlyEnforceIf(above)
-                self.model.Add(y2 + rect2.height <= y1).OnlyEnforceIf(below)
-
-                self.model.AddBoolOr([left, right, above, below])
-        # Set a time limit for the solver
-        self.solver.parameters.max_time_in_seconds = 120  # 5 minutes
-
-        # Solve the model
-        status = self.solver.Solve(self.model)
-        
-        if status == cp_model.FEASIBLE:
-            print("Feasible solution found.")
-        elif status == cp_model.OPTIMAL:
-            print("Optimal solution found.")
-        else:
-            print("No solution found within the time limit.")
-            
-        if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
-            for rect, x_var, y_var, i in self.variables:
-                x = self.solver.Value(x_var)
-                y = self.solver.Value(y_var)
-                rect.placements.append((x, y))
-                self.optimization_steps.append(f"Rectangle {rect.id} Instance {i}: Placed at ({x}, {y})")
-        else:
-            print("No solution found.")
-        return status  # Return the solving status
-
-    def log_optimization_steps(self):
-        # Log the detailed procedure information
-        for step in self.optimization_steps:
-            print(step)
-
 # Define your rectangles and initialize the packer
 rectangles = [
     Rectangle(1, 30, 405, 10),
@@ -134,9 +56,10 @@ rectangles = [
 
 bin_width = 400
 bin_height = 1200
+num_search_workers = None  # CP-SAT workers; None uses one per core
 
 packer = ORToolsRectanglePacker(bin_width, bin_height, rectangles)
-status = packer.pack()
+status = packer.pack(num_search_workers=num_search_workers, sink=print_progress)
 
 # Plot the final layout and log optimization steps
 plot_layout(rectangles, bin_width, bin_height)
@@ -0,0 +1,125 @@
+import itertools
+import random
+
+import pytest
+
+import multi_plate7
+import plate_storage
+
+
+def assert_no_overlaps(rects, bin_size):
+    for b, x, y, w, h, rid in rects:
+        assert 0 <= x and x + w <= bin_size[0] and 0 <= y and y + h <= bin_size[1], rid
+    for a, c in itertools.combinations(rects, 2):
+        if a[0] == c[0]:
+            assert (a[1] + a[3] <= c[1] or c[1] + c[3] <= a[1] or
+                    a[2] + a[4] <= c[2] or c[2] + c[4] <= a[2]), (a, c)
+
+
+def test_rect_list_expands_upright_and_turned_blocks():
+    # A 3 x 2 block of 40 x 70 pieces placed as is, and one placed turned (140 x 120)
+    blocks = {('block', 0): (40, 70, 3, 2, ['a0', 'a1', 'a2', 'a3', 'a4', 'a5']),
+              ('block', 1): (40, 70, 3, 2, ['b0', 'b1', 'b2', 'b3', 'b4', 'b5'])}
+    rects = [(0, 0, 0, 120, 140, ('block', 0)), (0, 120, 0, 140, 120, ('block', 1)), (0, 0, 140, 40, 70, 'c')]
+    result = multi_plate7.PackingResult(rects, 1, [], [], blocks)
+
+    expanded = result.rect_list()
+    assert sorted(r[5] for r in expanded) == sorted(blocks[('block', 0)][4] + blocks[('block', 1)][4] + ['c'])
+    assert {(w, h) for b, x, y, w, h, rid in expanded if rid.startswith('a')} == {(40, 70)}
+    assert {(w, h) for b, x, y, w, h, rid in expanded if rid.startswith('b')} == {(70, 40)}
+    assert_no_overlaps(expanded, (300, 300))
+    # The pieces of each block cover exactly its footprint
+    assert sum(w * h for b, x, y, w, h, rid in expanded if rid.startswith('b')) == 140 * 120
+    assert all(120 <= x and x + w <= 260 and y + h <= 120 for b, x, y, w, h, rid in expanded if rid.startswith('b'))
+
+
+def test_blocks_algorithm_places_every_piece_once():
+    rng = random.Random(4)
+    with_blocks = 0
+    for _ in range(10):
+        rectangles = []
+        for type_id in range(rng.randint(2, 6)):
+            width, height = rng.randint(20, 200), rng.randint(20, 200)
+            rectangles += [(width, height, type_id, f"{type_id}-{k}") for k in range(rng.randint(5, 60))]
+        result = multi_plate7.pack_rectangles(rectangles, (1000, 600), use_blocks=True)
+        with_blocks += bool(result.blocks)
+        placed = result.rect_list()
+        assert result.complete
+        assert sorted(r[5] for r in placed) == sorted(r[3] for r in rectangles)
+        sizes = {r[3]: {(r[0], r[1]), (r[1], r[0])} for r in rectangles}
+        assert all((w, h) in sizes[rid] for b, x, y, w, h, rid in placed)
+        assert_no_overlaps(placed, (1000, 600))
+    assert with_blocks
+
+
+def test_dxf_inserts_cover_their_placed_rectangles(tmp_path):
+    ezdxf = __import__('ezdxf')
+    rng = random.Random(7)
+    # One type in several sizes, as a --stream feed may send it, plus a second type
+    sizes = [(130, 410), (320, 290), (75.5, 60), (200, 90)]
+    rectangles = [(*rng.choice(sizes), 0, f"S{k}") for k in range(40)]
+    rectangles += [(150, 150, 1, f"T{k}") for k in range(5)]
+    bin_size = (1000, 800)
+    result = multi_plate7.pack_rectangles(rectangles, bin_size)
+    filename = str(tmp_path / "out.dxf")
+    multi_plate7.save_to_dxf(result, rectangles, bin_size, filename)
+
+    doc = ezdxf.readfile(filename)
+    extents = []
+    for insert in doc.modelspace().query('INSERT'):
+        points = [insert.matrix44().transform((x, y, 0))
+                  for x, y, *_ in doc.blocks[insert.dxf.name].query('LWPOLYLINE')[0].get_points()]
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        extents.append(tuple(round(v, 6) for v in (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))))
+    expected = [tuple(round(v, 6) for v in (b * (bin_size[0] + 100) + x, y, w, h))
+                for b, x, y, w, h, rid in result.rect_list()]
+    assert sorted(extents) == sorted(expected)
+
+
+def test_incremental_job_leaves_released_bins_unchanged(tmp_path):
+    db = str(tmp_path / "results.db")
+    bin_size = (1000, 1000)
+    rng = random.Random(11)
+    rectangles = [(w, h, type_id, f"{type_id}-{k}") for type_id, (w, h) in
+                  enumerate((rng.randint(50, 300), rng.randint(50, 300)) for _ in range(8))
+                  for k in range(rng.randint(5, 30))]
+    first = multi_plate7.pack_rectangles(rectangles, bin_size)
+    job_id = multi_plate7.save_to_database(first, rectangles, bin_size, db)
+    released = [0, len(first) - 1]
+    plate_storage.release_bins(db, job_id, released)
+
+    job, placed_rects, placed, kept = multi_plate7.load_job(db)
+    assert kept == released
+    new = [(60, 40, 'new', f"n{k}") for k in range(80)] + [(400, 300, 'big', f"b{k}") for k in range(10)]
+    second = multi_plate7.pack_incremental(rectangles + new, bin_size, placed_rects, job[4], kept)
+    assert second.complete
+    assert_no_overlaps(second.rect_list(), bin_size)
+    second_id = multi_plate7.save_to_database(second, rectangles + new, bin_size, db, kept)
+
+    with plate_storage.ResultsReader(db, pool_size=1) as reader:
+        assert reader.released_bins(second_id) == released
+        for bin_id in released:
+            before = [row[1:] for row in reader.placements_for_bin(bin_id, job_id)]
+            after = [row[1:] for row in reader.placements_for_bin(bin_id, second_id)]
+            assert sorted(after) == sorted(before)
+        # The new parts went somewhere else: onto open bins or new ones
+        new_ids = {r[3] for r in new}
+        assert all(row[2] not in new_ids for bin_id in released
+                   for row in reader.placements_for_bin(bin_id, second_id))
+
+
+def test_bad_release_writes_nothing(tmp_path):
+    missing = tmp_path / "missing.db"
+    with pytest.raises(ValueError):
+        plate_storage.release_bins(str(missing), None, [0])
+    assert not missing.exists()
+
+    db = str(tmp_path / "results.db")
+    rectangles = [(300, 200, 0, str(k)) for k in range(20)]
+    result = multi_plate7.pack_rectangles(rectangles, (1000, 1000))
+    job_id = multi_plate7.save_to_database(result, rectangles, (1000, 1000), db)
+    for job, bins in ((job_id + 1, [0]), (job_id, [len(result)]), (job_id, [-1])):
+        with pytest.raises(ValueError):
+            plate_storage.release_bins(db, job, bins)
+    with plate_storage.ResultsReader(db, pool_size=1) as reader:
+        assert reader.released_bins(job_id) == []
@@ -0,0 +1,66 @@
+import random
+
+import numpy as np
+
+from occupancy import BitmapGrid, CornerPointGrid, OccupancyGrid, grid_scale
+
+
+def brute_force_position(board, width, height):
+    # First anchor in x-then-y order whose w x h window is free, by scanning every cell
+    cols, rows = board.shape
+    for x in range(cols - width + 1):
+        for y in range(rows - height + 1):
+            if not board[x:x + width, y:y + height].any():
+                return x, y
+    return None
+
+
+def fill_and_compare(engines, board_size, sizes):
+    board = np.zeros(board_size, dtype=bool)
+    for width, height in sizes:
+        expected = brute_force_position(board, width, height)
+        for engine in engines:
+            assert engine.find_position(width, height) == expected, (type(engine).__name__, width, height)
+        if expected is not None:
+            x, y = expected
+            board[x:x + width, y:y + height] = True
+            for engine in engines:
+                assert not engine.is_occupied(x, y, width, height)
+                engine.mark_occupied(x, y, width, height)
+                assert engine.is_occupied(x, y, width, height)
+
+
+def test_engines_match_brute_force_scan():
+    rng = random.Random(0)
+    for _ in range(300):
+        width, height = rng.randint(10, 40), rng.randint(10, 70)
+        sizes = [(rng.randint(1, 15), rng.randint(1, 15)) for _ in range(rng.randint(5, 40))]
+        fill_and_compare([OccupancyGrid(width, height), BitmapGrid(width, height), CornerPointGrid(width, height)],
+                         (width, height), sizes)
+
+
+def test_scaled_grids_match_brute_force_scan():
+    rng = random.Random(1)
+    for _ in range(50):
+        width, height = 5 * rng.randint(4, 16), 5 * rng.randint(4, 24)
+        sizes = [(5 * rng.randint(1, 4), 5 * rng.randint(1, 4)) for _ in range(rng.randint(5, 30))]
+        scale = grid_scale(sizes, width, height)
+        assert scale[0] % 5 == 0
+        fill_and_compare([OccupancyGrid(width, height, scale), BitmapGrid(width, height, scale)], (width, height), sizes)
+
+
+def test_free_positions_lists_every_free_anchor():
+    rng = random.Random(2)
+    for _ in range(100):
+        width, height = rng.randint(10, 40), rng.randint(10, 40)
+        grid = OccupancyGrid(width, height)
+        board = np.zeros((width, height), dtype=bool)
+        for _ in range(rng.randint(0, 10)):
+            x, y = rng.randrange(width), rng.randrange(height)
+            w, h = rng.randint(1, width - x), rng.randint(1, height - y)
+            grid.mark_occupied(x, y, w, h)  # overlapping parts take the full-rebuild path
+            board[x:x + w, y:y + h] = True
+        w, h = rng.randint(1, width), rng.randint(1, height)
+        expected = np.array([[not board[x:x + w, y:y + h].any() for y in range(height - h + 1)]
+                             for x in range(width - w + 1)], dtype=bool)
+        assert np.array_equal(grid.free_positions(w, h), expected)
@@ -0,0 +1,44 @@
+import random
+
+import multi_plate7
+import result_cache
+
+
+def test_cached_layout_maps_renumbered_pieces_to_the_same_slots(tmp_path):
+    rng = random.Random(3)
+    rectangles = [(w, h, type_id, f"{type_id}-{k}")
+                  for type_id, (w, h) in enumerate([(120, 80), (300, 210), (55, 55), (120, 80)])
+                  for k in range(rng.randint(3, 12))]
+    bin_size = (600, 400)
+    result = multi_plate7.pack_rectangles(rectangles, bin_size)
+    key = result_cache.job_key(rectangles, bin_size, 'maxrects')
+
+    # The same job again, with every piece renumbered and the input in another order
+    renumbered = [(w, h, type_id, f"new-{rid}") for w, h, type_id, rid in rectangles]
+    rng.shuffle(renumbered)
+    assert result_cache.job_key(renumbered, bin_size, 'maxrects') == key
+
+    with result_cache.ResultCache(str(tmp_path / "cache.db")) as cache:
+        cache.put(key, rectangles, result)
+        rects, bin_count, unpacked, oversized, config = cache.get(key, renumbered)
+
+    # Slot k of group g holds the k-th piece of that group in both jobs
+    new_id = {}
+    for (old_key, old_ids), (new_key, new_ids) in zip(result_cache.part_groups(rectangles),
+                                                      result_cache.part_groups(renumbered)):
+        assert old_key == new_key
+        new_id.update(zip(old_ids, new_ids))
+    assert bin_count == len(result)
+    assert sorted(rects) == sorted((b, x, y, w, h, new_id[rid]) for b, x, y, w, h, rid in result.rect_list())
+    assert unpacked == [new_id[rid] for rid in result.unpacked]
+    assert oversized == [new_id[rid] for rid in result.oversized]
+
+
+def test_key_ignores_piece_ids_but_not_sizes_or_settings():
+    rectangles = [(100, 50, 0, 'a'), (100, 50, 0, 'b'), (70, 20, 1, 'c')]
+    key = result_cache.job_key(rectangles, (500, 500), 'patterns', {'time_limit': None})
+    assert result_cache.job_key([(100, 50, 0, 'x'), (70, 20, 1, 'y'), (100, 50, 0, 'z')], (500, 500), 'patterns',
+                                {'time_limit': None}) == key
+    assert result_cache.job_key([(100, 50, 0, 'a'), (100, 50, 0, 'b'), (20, 70, 1, 'c')], (500, 500), 'patterns',
+                                {'time_limit': None}) != key
+    assert result_cache.job_key(rectangles, (500, 500), 'patterns', {'time_limit': None, 'workers': 2}) != key